@@ -1,4 +1,7 @@
 # Example: Loading and using the HDF5 file
+# (import hdf5plugin first if q_values was written with Bitshuffle+LZ4)
+import hdf5plugin
+
 with h5py.File('q_snps_fdr_corrected.h5', 'r') as hf:
     # Access data
     chr_data = hf['snp_data/chr'][:]
@@ -1,25 +1,21 @@
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pacsv
 import gzip
 import os
 
 # Task 1: Read tab-separated file and create all_snps dataframe
 print("Reading merge.bim file...")
-all_snps = pd.read_csv('/gpfs/chencao/ysbioinfor/Datasets/ukb/geno/EUR_protein/hm3/all/merge.bim', 
-                       sep='\t', 
-                       header=None)
+bim_table = pacsv.read_csv('/gpfs/chencao/ysbioinfor/Datasets/ukb/geno/EUR_protein/hm3/all/merge.bim',
+                           read_options=pacsv.ReadOptions(autogenerate_column_names=True),
+                           parse_options=pacsv.ParseOptions(delimiter='\t'),
+                           convert_options=pacsv.ConvertOptions(
+                               include_columns=['f0', 'f1'],
+                               column_types={'f0': pa.int32(), 'f1': pa.string()}))
 
 # Task 2: Keep only first two columns and rename them
-all_snps = all_snps.iloc[:, :2]
-all_snps.columns = ['chr', 'rs']
-
-# Task 3: Read the file again (as specified in instructions)
-# This seems redundant but following the instructions exactly
-all_snps = pd.read_csv('/gpfs/chencao/ysbioinfor/Datasets/ukb/geno/EUR_protein/hm3/all/merge.bim', 
-                       sep='\t', 
-                       header=None)
-all_snps = all_snps.iloc[:, :2]
-all_snps.columns = ['chr', 'rs']
+all_snps = bim_table.rename_columns(['chr', 'rs']).to_pandas(types_mapper=pd.ArrowDtype)
 
 # Task 4: Create empty columns with specified names
 phenotype_columns = [
@@ -71,12 +67,6 @@ for phenotype in phenotype_columns:
     except Exception as e:
         print(f"Error processing {phenotype}: {str(e)}")
 
-# Task 7: Save p_snps as CSV file
-output_path = 'p_snps_results.csv'
-print(f"Saving results to {output_path}...")
-p_snps.to_csv(output_path, index=False)
-print("CSV file saved successfully!")
-
 # Task 8: Drop columns with all NA values and save as pickle
 print("\nCleaning dataset by removing columns with all NA values...")
 
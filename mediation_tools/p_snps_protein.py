@@ -8,12 +8,14 @@ p-value matrix for genetic analysis.
 
 import pandas as pd
 import numpy as np
-import gzip
+import pyarrow as pa
+import pyarrow.csv as pacsv
 import os
 import logging
-from typing import Dict, List, Optional, Tuple
+from typing import List, Optional, Tuple
 from pathlib import Path
 import warnings
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Configure logging
 logging.basicConfig(
@@ -52,15 +54,17 @@ class SNPPhenotypeAnalyzer:
         logger.info(f"Reading BIM file: {self.bim_file}")
         
         try:
-            # Read BIM file (PLINK format)
-            snp_data = pd.read_csv(
+            # Read BIM file (PLINK format); explicit schema, first two columns only
+            table = pacsv.read_csv(
                 self.bim_file,
-                sep='\t',
-                header=None,
-                names=['chr', 'rs', 'pos_cm', 'pos_bp', 'a1', 'a2'],
-                usecols=[0, 1]  # Only read first two columns
+                read_options=pacsv.ReadOptions(autogenerate_column_names=True),
+                parse_options=pacsv.ParseOptions(delimiter='\t'),
+                convert_options=pacsv.ConvertOptions(
+                    include_columns=['f0', 'f1'],
+                    column_types={'f0': pa.int32(), 'f1': pa.string()}
+                )
             )
-            snp_data.columns = ['chr', 'rs']
+            snp_data = table.rename_columns(['chr', 'rs']).to_pandas(types_mapper=pd.ArrowDtype)
             
             logger.info(f"Loaded {len(snp_data):,} SNPs")
             return snp_data
@@ -106,7 +110,7 @@ class SNPPhenotypeAnalyzer:
         phenotype_df = pd.DataFrame(
             index=snp_data.index,
             columns=phenotypes,
-            dtype=np.float64
+            dtype=np.float32
         )
         
         # Concatenate SNP data with phenotype columns
@@ -115,7 +119,7 @@ class SNPPhenotypeAnalyzer:
         logger.info(f"Initialized DataFrame with shape: {p_snps.shape}")
         return p_snps
     
-    def load_phenotype_associations(self, phenotype: str) -> Optional[Dict[str, float]]:
+    def load_phenotype_associations(self, phenotype: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
         """
         Load p-values for a specific phenotype.
         
@@ -123,7 +127,7 @@ class SNPPhenotypeAnalyzer:
             phenotype: Phenotype name
             
         Returns:
-            Dictionary mapping rs IDs to p-values, or None if loading fails
+            Tuple of (rs ID array, float32 p-value array), or None if loading fails
         """
         file_path = self.base_dir / phenotype / "output" / "summ_all.assoc.txt.gz"
         
@@ -132,49 +136,41 @@ class SNPPhenotypeAnalyzer:
             return None
         
         try:
-            # Read compressed association file
-            with gzip.open(file_path, 'rt') as f:
-                # Read header to determine column positions
-                header = f.readline().strip().split('\t')
-                
-                # Find rs and p_wald column indices
-                try:
-                    rs_idx = 1  # Usually second column
-                    p_wald_idx = header.index('p_wald') if 'p_wald' in header else -1
-                except ValueError:
-                    p_wald_idx = -1  # Default to last column
-                
-                # Reset file pointer
-                f.seek(0)
-                
-                # Read data efficiently
-                summ = pd.read_csv(
-                    f,
-                    sep='\t',
-                    usecols=[rs_idx, p_wald_idx],
-                    dtype={rs_idx: str, p_wald_idx: np.float64}
+            # Multithreaded Arrow parser; .gz is decompressed transparently
+            table = pacsv.read_csv(
+                file_path,
+                parse_options=pacsv.ParseOptions(delimiter='\t'),
+                convert_options=pacsv.ConvertOptions(
+                    include_columns=['rs', 'p_wald'],
+                    column_types={'rs': pa.string(), 'p_wald': pa.float32()}
                 )
+            )
             
-            # Ensure proper column names
-            summ.columns = ['rs', 'p_wald']
-            
-            # Create mapping dictionary
-            rs_to_p_wald = dict(zip(summ['rs'], summ['p_wald']))
+            rs_ids = table.column('rs').to_numpy()
+            p_wald = table.column('p_wald').to_numpy()
             
-            logger.info(f"Loaded {len(rs_to_p_wald):,} associations for {phenotype}")
-            return rs_to_p_wald
+            logger.info(f"Loaded {len(rs_ids):,} associations for {phenotype}")
+            return rs_ids, p_wald
             
         except Exception as e:
             logger.error(f"Error processing {phenotype}: {e}")
             return None
     
-    def process_all_phenotypes(self, p_snps: pd.DataFrame, phenotypes: List[str]) -> pd.DataFrame:
+    def process_all_phenotypes(self, p_snps: pd.DataFrame, phenotypes: List[str],
+                               n_threads: int = 8) -> pd.DataFrame:
         """
         Process all phenotype associations and fill p-values.
         
+        Association files are loaded concurrently on worker threads (the
+        Arrow CSV reader releases the GIL); columns are
+        filled on the calling thread as loads complete: every BIM row,
+        duplicated rs IDs included, takes its p-value from a hash lookup
+        into the phenotype's rs IDs, as Series.map would.
+        
         Args:
             p_snps: DataFrame with SNP data and empty phenotype columns
             phenotypes: List of phenotype names
+            n_threads: Number of concurrent file loaders
             
         Returns:
             DataFrame with filled p-values
@@ -184,17 +180,39 @@ class SNPPhenotypeAnalyzer:
         successful_phenotypes = []
         failed_phenotypes = []
         
-        for i, phenotype in enumerate(phenotypes, 1):
-            logger.info(f"Processing {phenotype} ({i}/{len(phenotypes)})...")
-            
-            rs_to_p_wald = self.load_phenotype_associations(phenotype)
+        # BIM rs IDs looked up in every phenotype
+        bim_rs = pd.Index(p_snps['rs'].to_numpy())
+        col_index = {phenotype: j for j, phenotype in enumerate(phenotypes)}
+        p_matrix = np.full((len(p_snps), len(phenotypes)), np.nan, dtype=np.float32)
+        
+        with ThreadPoolExecutor(max_workers=n_threads) as executor:
+            futures = {
+                executor.submit(self.load_phenotype_associations, phenotype): phenotype
+                for phenotype in phenotypes
+            }
             
-            if rs_to_p_wald:
-                # Vectorized mapping for efficiency
-                p_snps[phenotype] = p_snps['rs'].map(rs_to_p_wald)
-                successful_phenotypes.append(phenotype)
-            else:
-                failed_phenotypes.append(phenotype)
+            for i, future in enumerate(as_completed(futures), 1):
+                phenotype = futures[future]
+                logger.info(f"Processing {phenotype} ({i}/{len(phenotypes)})...")
+                
+                associations = future.result()
+                
+                if associations is not None and len(associations[0]):
+                    summ_rs, summ_p = associations
+                    summ_index = pd.Index(summ_rs)
+                    if not summ_index.is_unique:
+                        # The last association of a repeated rs ID wins, as
+                        # with the baseline's rs -> p_wald dict
+                        last = ~summ_index.duplicated(keep='last')
+                        summ_index, summ_p = summ_index[last], summ_p[last]
+                    src = summ_index.get_indexer(bim_rs)
+                    found = src >= 0
+                    p_matrix[found, col_index[phenotype]] = summ_p[src[found]]
+                    successful_phenotypes.append(phenotype)
+                else:
+                    failed_phenotypes.append(phenotype)
+        
+        p_snps.loc[:, phenotypes] = p_matrix
         
         # Log summary
         logger.info(f"Successfully processed: {len(successful_phenotypes)} phenotypes")
@@ -215,12 +233,15 @@ class SNPPhenotypeAnalyzer:
         """
         logger.info("Cleaning dataset by removing columns with all NA values...")
         
-        # Identify columns with all NA values
-        na_mask = p_snps.isna().all()
-        na_columns = p_snps.columns[na_mask].tolist()
+        # Identify all-NA phenotype columns on the float block directly,
+        # without materialising an isna() frame
+        phenotypes = [col for col in p_snps.columns if col not in ('chr', 'rs')]
+        na_mask = np.isnan(p_snps[phenotypes].to_numpy(dtype=np.float32)).all(axis=0)
+        na_columns = [col for col, drop in zip(phenotypes, na_mask) if drop]
+        keep_columns = [col for col, drop in zip(phenotypes, na_mask) if not drop]
         
         # Drop columns with all NA values
-        p_snps_cleaned = p_snps.loc[:, ~na_mask]
+        p_snps_cleaned = pd.concat([p_snps[['chr', 'rs']], p_snps[keep_columns]], axis=1)
         
         if na_columns:
             logger.info(f"Removed {len(na_columns)} columns with all NA values")
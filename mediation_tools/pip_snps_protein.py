@@ -5,19 +5,25 @@ SNP–Phenotype Association Analysis Pipeline
 This script reads SNP information from a PLINK .bim file and aggregates
 SuSiE posterior inclusion probabilities (pip_susie) from compressed
 association results for multiple phenotypes into a single DataFrame.
-It then cleans the resulting matrix, saves it to a pickle file, and
+It then cleans the resulting matrix, saves it to a Parquet file, and
 generates summary statistics.
 """
 
 import logging
-import gzip
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
 import warnings
 
+try:
+    from isal import igzip as gzip  # ISA-L inflate, drop-in for stdlib gzip
+except ImportError:
+    import gzip
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -30,6 +36,92 @@ logger = logging.getLogger(__name__)
 warnings.filterwarnings("ignore", category=pd.errors.PerformanceWarning)
 
 
+def _parse_float(token: bytes) -> float:
+    """Parses a numeric field, mapping 'NA' and other non-numbers to NaN."""
+    try:
+        return float(token)
+    except ValueError:
+        return np.nan
+
+
+def read_pip_susie(base_dir: Path, phenotype: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Loads 'rs' and 'pip_susie' values for a single phenotype.
+
+    Args:
+        base_dir: Directory containing phenotype subdirectories.
+        phenotype: Name of the phenotype subdirectory.
+
+    Returns:
+        Tuple of (rs ID array, pip_susie array), or None on failure.
+    """
+    assoc_path = base_dir / phenotype / "output" / "summ_all2.assoc.txt.gz"
+    if not assoc_path.exists():
+        logger.warning(f"Missing file for phenotype '{phenotype}': {assoc_path}")
+        return None
+
+    try:
+        # bytes mode: no UTF-8 decode of the numeric columns
+        with gzip.open(assoc_path, "rb") as f:
+            header = f.readline().decode("ascii").strip().split("\t")
+            rs_idx = 1
+            pip_idx = header.index("pip_susie") if "pip_susie" in header else -1
+
+            if pip_idx < 0:
+                logger.error(f"'pip_susie' column not found in {phenotype} header")
+                return None
+
+            # keep streaming past the header; split only as far as needed,
+            # skipping blank or truncated lines as the pandas reader did
+            rs_list, pip_list = [], []
+            max_split = max(rs_idx, pip_idx) + 1
+            for line in f:
+                parts = line.split(b"\t", max_split)
+                if len(parts) < max_split:
+                    continue
+                rs_list.append(parts[rs_idx].decode("ascii"))
+                pip_list.append(parts[pip_idx])
+
+        rs_ids = np.asarray(rs_list, dtype=object)
+        pips = np.fromiter(map(_parse_float, pip_list),
+                           dtype=np.float32, count=len(pip_list))
+        logger.info(f"Loaded {len(rs_ids):,} pip_susie values for '{phenotype}'")
+        return rs_ids, pips
+
+    except Exception as e:
+        logger.error(f"Error reading associations for '{phenotype}': {e}")
+        return None
+
+
+# Per-process state for ProcessPoolExecutor workers, set by _init_worker
+_worker_base_dir: Optional[Path] = None
+_worker_rs_index: Optional[pd.Index] = None
+
+
+def _init_worker(base_dir: Path, rs_index: pd.Index) -> None:
+    """Receives the shared rs -> row lookup once per worker process."""
+    global _worker_base_dir, _worker_rs_index
+    _worker_base_dir = base_dir
+    _worker_rs_index = rs_index
+
+
+def _load_one(phenotype: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Worker task: parses one phenotype and resolves its rs IDs to matrix rows.
+
+    Returns:
+        Tuple of (int32 row indices, pip_susie values) restricted to SNPs
+        present in the BIM file, or None on failure.
+    """
+    loaded = read_pip_susie(_worker_base_dir, phenotype)
+    if loaded is None or not len(loaded[0]):
+        return None
+    rs_ids, pips = loaded
+    rows = _worker_rs_index.get_indexer(rs_ids)     # -1 where rs is not in the BIM
+    valid = rows >= 0
+    return rows[valid].astype(np.int32), pips[valid]
+
+
 class SNPPhenotypeAnalyzer:
     """
     Aggregates pip_susie values for multiple phenotypes into a single matrix.
@@ -86,117 +178,96 @@ class SNPPhenotypeAnalyzer:
             logger.error(f"Failed to list phenotypes: {e}")
             raise
 
-    def initialize_matrix(self,
-                          snp_df: pd.DataFrame,
-                          phenotypes: List[str]) -> pd.DataFrame:
-        """
-        Creates an empty DataFrame indexed by SNPs, with one column per phenotype.
-
-        Args:
-            snp_df: DataFrame containing SNP 'chr' and 'rs'.
-            phenotypes: List of phenotype column names.
-
-        Returns:
-            DataFrame with columns ['chr', 'rs'] + phenotypes, all phenotype
-            values initialized to NaN.
+    def load_pip_susie(self, phenotype: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
         """
-        logger.info("Initializing results matrix...")
-        empty = pd.DataFrame(index=snp_df.index,
-                             columns=phenotypes,
-                             dtype=np.float64)
-        matrix = pd.concat([snp_df, empty], axis=1)
-        logger.info(f"Initialized matrix of shape {matrix.shape}")
-        return matrix
-
-    def load_pip_susie(self, phenotype: str) -> Optional[Dict[str, float]]:
-        """
-        Loads 'rs' -> 'pip_susie' mappings for a single phenotype.
+        Loads 'rs' and 'pip_susie' values for a single phenotype.
 
         Args:
             phenotype: Name of the phenotype subdirectory.
 
         Returns:
-            Dictionary mapping rs IDs to pip_susie values, or None on failure.
+            Tuple of (rs ID array, pip_susie array), or None on failure.
         """
-        assoc_path = self.base_dir / phenotype / "output" / "summ_all2.assoc.txt.gz"
-        if not assoc_path.exists():
-            logger.warning(f"Missing file for phenotype '{phenotype}': {assoc_path}")
-            return None
-
-        try:
-            with gzip.open(assoc_path, "rt") as f:
-                header = f.readline().strip().split("\t")
-                rs_idx = 1
-                pip_idx = header.index("pip_susie") if "pip_susie" in header else -1
-
-                if pip_idx < 0:
-                    logger.error(f"'pip_susie' column not found in {phenotype} header")
-                    return None
-
-                # rewind and read only the needed columns
-                f.seek(0)
-                df = pd.read_csv(
-                    f,
-                    sep="\t",
-                    usecols=[rs_idx, pip_idx],
-                    dtype={rs_idx: str, pip_idx: np.float64}
-                )
-
-            df.columns = ["rs", "pip_susie"]
-            mapping = dict(zip(df["rs"], df["pip_susie"]))
-            logger.info(f"Loaded {len(mapping):,} pip_susie values for '{phenotype}'")
-            return mapping
-
-        except Exception as e:
-            logger.error(f"Error reading associations for '{phenotype}': {e}")
-            return None
+        return read_pip_susie(self.base_dir, phenotype)
 
     def aggregate(self,
-                  matrix: pd.DataFrame,
-                  phenotypes: List[str]) -> pd.DataFrame:
+                  snp_df: pd.DataFrame,
+                  phenotypes: List[str],
+                  n_workers: Optional[int] = None) -> np.ndarray:
         """
-        Fills the matrix with pip_susie values for all phenotypes.
+        Collects pip_susie values for all phenotypes into one SNP x phenotype block.
+
+        Parsing is CPU-bound pure Python, so phenotypes are fanned out to a
+        process pool; each worker returns SNP row indices and values that
+        are scattered into a single NumPy block.
 
         Args:
-            matrix: DataFrame initialized by initialize_matrix().
+            snp_df: DataFrame containing SNP 'chr' and 'rs'.
             phenotypes: List of phenotype names.
+            n_workers: Number of worker processes (default: CPU count).
 
         Returns:
-            DataFrame with pip_susie values filled in.
+            float32 array of shape (n_snps, n_phenotypes), NaN where missing.
         """
         logger.info("Aggregating pip_susie across all phenotypes...")
         successes, failures = [], []
 
-        for idx, pheno in enumerate(phenotypes, start=1):
-            logger.info(f"[{idx}/{len(phenotypes)}] Processing '{pheno}'")
-            mapping = self.load_pip_susie(pheno)
-            if mapping:
-                matrix[pheno] = matrix["rs"].map(mapping)
-                successes.append(pheno)
-            else:
-                failures.append(pheno)
+        # C-level hash table; get_indexer resolves a whole rs array per call.
+        # BIM files can repeat rs IDs (e.g. '.'), so only the first row of
+        # each ID is looked up and filled
+        bim_rs = pd.Index(snp_df["rs"].to_numpy())
+        first_rows = np.flatnonzero(~bim_rs.duplicated(keep="first"))
+        if len(first_rows) < len(bim_rs):
+            logger.warning(f"{len(bim_rs) - len(first_rows):,} duplicated rs IDs in the BIM "
+                           f"file; only the first occurrence of each is filled")
+        rs_index = bim_rs[first_rows]
+        # PIPs lie in [0, 1]; float32 halves memory and the output size
+        data = np.full((len(snp_df), len(phenotypes)), np.nan, dtype=np.float32)
+
+        with ProcessPoolExecutor(max_workers=n_workers or os.cpu_count(),
+                                 initializer=_init_worker,
+                                 initargs=(self.base_dir, rs_index)) as executor:
+            results = executor.map(_load_one, phenotypes, chunksize=4)
+            for idx, (pheno, loaded) in enumerate(zip(phenotypes, results), start=1):
+                logger.info(f"[{idx}/{len(phenotypes)}] Processed '{pheno}'")
+                if loaded is not None:
+                    rows, pips = loaded
+                    data[first_rows[rows], idx - 1] = pips
+                    successes.append(pheno)
+                else:
+                    failures.append(pheno)
 
         logger.info(f"Successfully processed {len(successes)} phenotypes")
         if failures:
             logger.warning(f"Failed to process {len(failures)} phenotypes: {failures}")
 
-        return matrix
+        return data
 
     def clean(self,
-              matrix: pd.DataFrame) -> Tuple[pd.DataFrame, List[str]]:
+              snp_df: pd.DataFrame,
+              data: np.ndarray,
+              phenotypes: List[str]) -> Tuple[pd.DataFrame, List[str]]:
         """
-        Drops phenotype columns that are entirely NaN.
+        Drops phenotype columns that are entirely NaN and assembles the
+        final DataFrame.
 
         Args:
-            matrix: DataFrame after aggregation.
+            snp_df: DataFrame containing SNP 'chr' and 'rs'.
+            data: pip_susie block returned by aggregate().
+            phenotypes: Phenotype names, one per column of `data`.
 
         Returns:
             A tuple of (cleaned DataFrame, list of dropped columns).
         """
         logger.info("Cleaning matrix: dropping all-NaN columns...")
-        all_nan = matrix.isna().all()
-        to_drop = matrix.columns[all_nan].tolist()
-        cleaned = matrix.loc[:, ~all_nan]
+        keep = ~np.isnan(data).all(axis=0)
+        to_drop = [p for p, k in zip(phenotypes, keep) if not k]
+
+        # Built once from the kept columns; no NaN-filled frame to consolidate
+        values = pd.DataFrame(data[:, keep],
+                              columns=[p for p, k in zip(phenotypes, keep) if k],
+                              index=snp_df.index)
+        cleaned = pd.concat([snp_df, values], axis=1)
 
         if to_drop:
             logger.info(f"Dropped {len(to_drop)} columns: {to_drop}")
@@ -217,16 +288,16 @@ class SNPPhenotypeAnalyzer:
         """
         logger.info(f"Final matrix shape: {cleaned.shape}")
         snp_count = len(cleaned)
-        retained = [c for c in cleaned.columns if c in phenotypes]
+        pheno_set = set(phenotypes)
+        retained = [c for c in cleaned.columns if c in pheno_set]
         logger.info(f"Number of retained phenotypes: {len(retained)}")
 
-        stats = []
-        for pheno in retained:
-            non_na = cleaned[pheno].notna().sum()
-            coverage = non_na / snp_count * 100
-            stats.append((pheno, non_na, coverage))
-
-        stats.sort(key=lambda x: x[2], reverse=True)
+        # One pass over the whole block; stable sort keeps ties in column order
+        counts = cleaned[retained].notna().sum(axis=0).to_numpy()
+        coverage = counts / snp_count * 100
+        order = np.argsort(-coverage, kind="stable")
+        stats = list(zip(np.asarray(retained, dtype=object)[order],
+                         counts[order], coverage[order]))
 
         logger.info("Top 5 phenotypes by coverage:")
         for pheno, count, pct in stats[:5]:
@@ -239,25 +310,26 @@ class SNPPhenotypeAnalyzer:
                 logger.info(f"  {pheno}: {count:,} SNPs ({pct:.2f}%)")
 
     def run(self,
-            output_pickle: str = "snps_with_pip_susie.pkl") -> pd.DataFrame:
+            output_parquet: str = "snps_with_pip_susie.parquet") -> pd.DataFrame:
         """
-        Executes the full pipeline: load SNPs, list phenotypes, initialize matrix,
-        aggregate pip_susie, clean, save, and summarize.
+        Executes the full pipeline: load SNPs, list phenotypes, aggregate
+        pip_susie, clean, save, and summarize.
 
         Args:
-            output_pickle: Filename for the pickled output.
+            output_parquet: Filename for the Parquet output.
 
         Returns:
             The cleaned DataFrame containing pip_susie values.
         """
         snp_df = self.load_snp_data()
         phenotypes = self.list_phenotypes()
-        matrix = self.initialize_matrix(snp_df, phenotypes)
-        matrix = self.aggregate(matrix, phenotypes)
-        cleaned, dropped = self.clean(matrix)
+        data = self.aggregate(snp_df, phenotypes)
+        cleaned, dropped = self.clean(snp_df, data, phenotypes)
 
-        logger.info(f"Saving cleaned matrix to '{output_pickle}'")
-        cleaned.to_pickle(output_pickle)
+        logger.info(f"Saving cleaned matrix to '{output_parquet}'")
+        # Columnar + zstd keeps the float32 PIP columns compact and fast to load
+        cleaned.to_parquet(output_parquet, engine="pyarrow",
+                           compression="zstd", compression_level=3)
         logger.info("Save completed successfully")
 
         self.summarize(cleaned, phenotypes)
@@ -267,7 +339,7 @@ class SNPPhenotypeAnalyzer:
 def main():
     BASE_DIR = "/gpfs/chencao/ysbioinfor/project/proteohubProject/web_out/G-P/"
     BIM_FILE = "/gpfs/chencao/ysbioinfor/Datasets/ukb/geno/EUR_protein/hm3/all/merge.bim"
-    OUTPUT_FILE = "snps_with_pip_susie.pkl"
+    OUTPUT_FILE = "snps_with_pip_susie.parquet"
 
     analyzer = SNPPhenotypeAnalyzer(BASE_DIR, BIM_FILE)
     analyzer.run(OUTPUT_FILE)
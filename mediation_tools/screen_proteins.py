@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
-Parallel screening of Bonferroni-adjusted q-values and SuSiE PIP values.
+Vectorised screening of Bonferroni-adjusted q-values and SuSiE PIP values.
 
 A SNP–protein pair is reported as a “hit” when
     (q_value < bonferroni_threshold)  AND  (pip > pip_threshold)
@@ -13,31 +13,32 @@ Output:
 
 from __future__ import annotations
 
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Iterable, List, Tuple
+from typing import Iterator
 
+import numpy as np
 import pandas as pd
 
 # ──────────────────────────────  configuration  ──────────────────────────────
 BONFERRONI_PKL: Path = Path("q_snps_bonferroni.pkl")
-PIP_PKL:        Path = Path("snps_with_pip_susie.pkl")
+PIP_PARQUET:    Path = Path("snps_with_pip_susie.parquet")
 
 # Parameter grid
 BONFERRONI_THRESHOLDS: tuple[float, ...] = (0.05, 0.01)
 PIP_THRESHOLDS:        tuple[float, ...] = (0.90, 0.85, 0.80)
-
-MAX_THREADS: int = 12     # parallel worker threads
 # ──────────────────────────────────────────────────────────────────────────────
 
 
-def load_and_align() -> tuple[pd.DataFrame, pd.DataFrame]:
+def load_and_align() -> tuple[pd.DataFrame, list[str],
+                              np.ndarray, np.ndarray]:
     """
-    Read both pickle files, harmonise dtypes, sort by (chr, rs),
-    and return data frames with identical indices and column names.
+    Read the q-value pickle and the PIP Parquet file, harmonise dtypes,
+    match rows on (chr, rs), and return the shared (chr, rs) key frame (in
+    PIP-file order), the protein names, and the aligned q-value and PIP
+    blocks as C-contiguous float32 arrays.
     """
     bonf = pd.read_pickle(BONFERRONI_PKL)
-    pip  = pd.read_pickle(PIP_PKL)
+    pip  = pd.read_parquet(PIP_PARQUET, engine="pyarrow")
 
     # Basic header validation
     if bonf.columns.tolist()[:2] != ["chr", "rs"] \
@@ -48,75 +49,102 @@ def load_and_align() -> tuple[pd.DataFrame, pd.DataFrame]:
         raise ValueError("Protein (column 3 onward) names differ.")
 
     # Harmonise dtypes
-    bonf["chr"] = bonf["chr"].astype("int64")
-    pip["chr"]  = pip["chr"].astype("int64")
-    bonf["rs"]  = bonf["rs"].astype("string")
-    pip["rs"]   = pip["rs"].astype("string")
-
-    # Align on the intersection of (chr, rs)
-    bonf = bonf.set_index(["chr", "rs"]).sort_index()
-    pip  = pip.set_index(["chr", "rs"]).sort_index()
-
-    common_idx = bonf.index.intersection(pip.index)
-    if common_idx.empty:
+    bonf_chr = bonf["chr"].to_numpy(dtype=np.int64)
+    pip_chr  = pip["chr"].to_numpy(dtype=np.int64)
+    bonf_rs  = bonf["rs"].astype("string").to_numpy()
+    pip_rs   = pip["rs"].astype("string").to_numpy()
+
+    # Align on the intersection of (chr, rs) with one hash lookup
+    bonf_key = pd.MultiIndex.from_arrays([bonf_chr, bonf_rs])
+    if bonf_key.is_unique:
+        pip_key  = pd.MultiIndex.from_arrays([pip_chr, pip_rs])
+        pos      = bonf_key.get_indexer(pip_key)
+        pip_rows = np.flatnonzero(pos >= 0)
+        bonf_rows = pos[pip_rows]
+    else:
+        # Duplicated (chr, rs) keys, common in BIM-derived tables: pair rows
+        # with an inner merge, then restore the PIP-file order
+        pairs = pd.DataFrame({"chr": pip_chr, "rs": pip_rs,
+                              "pip_row": np.arange(len(pip))}).merge(
+            pd.DataFrame({"chr": bonf_chr, "rs": bonf_rs,
+                          "bonf_row": np.arange(len(bonf))}),
+            on=["chr", "rs"], how="inner").sort_values(["pip_row", "bonf_row"])
+        pip_rows  = pairs["pip_row"].to_numpy()
+        bonf_rows = pairs["bonf_row"].to_numpy()
+    if pip_rows.size == 0:
         raise ValueError("No overlapping (chr, rs) pairs between the two "
                          "input files.")
 
-    bonf = bonf.loc[common_idx].reset_index()
-    pip  = pip.loc[common_idx].reset_index()
-    return bonf, pip
+    # Materialise the value blocks once, row-major, so the whole-matrix
+    # compare in `screen_at` streams through memory
+    bonf_vals = np.ascontiguousarray(
+        bonf.iloc[:, 2:].to_numpy(dtype=np.float32)[bonf_rows])
+    pip_vals  = np.ascontiguousarray(
+        pip.iloc[:, 2:].to_numpy(dtype=np.float32)[pip_rows])
+    keys = pd.DataFrame({"chr": pip_chr[pip_rows], "rs": pip_rs[pip_rows]})
+    return keys, bonf.columns[2:].tolist(), bonf_vals, pip_vals
 
 
-def _collect_hits_for_protein(
-    protein: str,
-    bonf: pd.DataFrame,
-    pip: pd.DataFrame,
-    bonf_thr: float,
-    pip_thr: float,
-) -> List[Tuple[str, str, float, float]]:
+def precompute() -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
     """
-    Gather (rs, protein, q_value, pip) records for one protein column.
-    Designed to be executed inside a ThreadPoolExecutor.
+    Load and align the inputs once and return everything the threshold grid
+    reuses: the rs array, the protein-name array and the q-value / PIP
+    blocks.
     """
-    mask = (bonf[protein] < bonf_thr) & (pip[protein] > pip_thr)
-    if not mask.any():
-        return []
-
-    rs          = bonf.loc[mask, "rs"]
-    q_values    = bonf.loc[mask, protein]
-    pip_values  = pip.loc[mask, protein]
+    keys, proteins, bonf_vals, pip_vals = load_and_align()
+    return (keys["rs"].to_numpy(),
+            np.asarray(proteins, dtype=object),
+            bonf_vals,
+            pip_vals)
 
-    return [
-        (snp, protein, float(qv), float(pv))
-        for snp, qv, pv in zip(rs, q_values, pip_values, strict=True)
-    ]
 
-
-def screen_hits(
-    bonf: pd.DataFrame,
-    pip: pd.DataFrame,
+def screen_at(
+    precomp: tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray],
     bonf_thr: float,
     pip_thr: float,
-    *,
-    n_threads: int = MAX_THREADS,
 ) -> pd.DataFrame:
     """
-    Identify all SNP–protein hits for the given threshold pair.
+    Identify all SNP–protein hits for the given threshold pair with a
+    single 2-D mask over the aligned (SNP × protein) value blocks.
     """
-    protein_cols: Iterable[str] = bonf.columns[2:]   # skip chr, rs
+    _, _, bonf_vals, pip_vals = precomp
+    return _hits_from_mask(precomp, (bonf_vals < bonf_thr) & (pip_vals > pip_thr))
+
 
-    records: List[Tuple[str, str, float, float]] = []
-    with ThreadPoolExecutor(max_workers=n_threads) as pool:
-        futures = {
-            pool.submit(_collect_hits_for_protein,
-                        protein, bonf, pip, bonf_thr, pip_thr): protein
-            for protein in protein_cols
-        }
-        for fut in as_completed(futures):
-            records.extend(fut.result())
+def screen_grid(
+    precomp: tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray],
+    bonf_thrs: tuple[float, ...],
+    pip_thrs: tuple[float, ...],
+) -> Iterator[tuple[float, float, pd.DataFrame]]:
+    """
+    Screen every (bonf_thr, pip_thr) pair of the grid, comparing each value
+    block against each threshold only once; yields (bonf_thr, pip_thr, hits).
+    """
+    _, _, bonf_vals, pip_vals = precomp
+
+    # Threshold-major stacks keep every [i] slice contiguous
+    bonf_cmp = bonf_vals[None] < np.asarray(bonf_thrs, dtype=np.float32)[:, None, None]
+    pip_cmp  = pip_vals[None]  > np.asarray(pip_thrs,  dtype=np.float32)[:, None, None]
+
+    for i, bonf_thr in enumerate(bonf_thrs):
+        for j, pip_thr in enumerate(pip_thrs):
+            yield bonf_thr, pip_thr, _hits_from_mask(precomp, bonf_cmp[i] & pip_cmp[j])
+
+
+def _hits_from_mask(
+    precomp: tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray],
+    mask: np.ndarray,
+) -> pd.DataFrame:
+    """Gather the hit rows selected by a (SNP × protein) boolean mask."""
+    rs_arr, protein_names, bonf_vals, pip_vals = precomp
+    rs_idx, prot_idx = np.nonzero(mask)
 
-    return pd.DataFrame(records,
-                        columns=["snp_name", "protein", "q_value", "pip"])
+    return pd.DataFrame({
+        "snp_name": rs_arr[rs_idx],
+        "protein":  protein_names[prot_idx],
+        "q_value":  bonf_vals[rs_idx, prot_idx],
+        "pip":      pip_vals[rs_idx, prot_idx],
+    })
 
 
 def export_csv(df: pd.DataFrame, bonf_thr: float, pip_thr: float) -> Path:
@@ -130,24 +158,18 @@ def export_csv(df: pd.DataFrame, bonf_thr: float, pip_thr: float) -> Path:
 
 
 def main() -> None:
-    # 1. Load both data sets once
-    bonf_df, pip_df = load_and_align()
-
-    # 2. Iterate over the 2 × 3 parameter grid
-    for bonf_thr in BONFERRONI_THRESHOLDS:
-        for pip_thr in PIP_THRESHOLDS:
-            hits_df = screen_hits(
-                bonf_df, pip_df,
-                bonf_thr=bonf_thr,
-                pip_thr=pip_thr,
-                n_threads=MAX_THREADS,
-            )
-            csv_path = export_csv(hits_df, bonf_thr, pip_thr)
-
-            print(
-                f"[{bonf_thr:.3g}, {pip_thr:.3g}] "
-                f"→ {len(hits_df):,} hits → '{csv_path.name}'"
-            )
+    # 1. Load, align and derive the shared arrays once
+    precomp = precompute()
+
+    # 2. Screen the 2 × 3 parameter grid
+    for bonf_thr, pip_thr, hits_df in screen_grid(
+            precomp, BONFERRONI_THRESHOLDS, PIP_THRESHOLDS):
+        csv_path = export_csv(hits_df, bonf_thr, pip_thr)
+
+        print(
+            f"[{bonf_thr:.3g}, {pip_thr:.3g}] "
+            f"→ {len(hits_df):,} hits → '{csv_path.name}'"
+        )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,19 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fdr_correction import _q_chunk_shape
+
+
+def test_balanced_chunks_of_tall_matrix_span_whole_rows():
+    chunk_r, chunk_c = _q_chunk_shape(10_000_000, 58, "balanced")
+    assert chunk_c == 58
+    assert chunk_r > 1
+
+
+def test_balanced_chunks_stay_near_64kb():
+    for m, n in [(10_000_000, 58), (1_000, 1_000), (50, 2_000_000)]:
+        chunk_r, chunk_c = _q_chunk_shape(m, n, "balanced")
+        assert 1 <= chunk_r <= m and 1 <= chunk_c <= n
+        assert chunk_r * chunk_c * 4 <= 65536
@@ -24,12 +24,33 @@ from __future__ import annotations
 import sys
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
-from scipy.stats import pearsonr
+from scipy.special import stdtr
 
 # ---------------------------------------------------------------------
 # 1. Load and merge discovery files
 # ---------------------------------------------------------------------
+DISCOVERY_COLS = [
+    "CHROM", "GENPOS", "ID",
+    "ALLELE0", "ALLELE1",
+    "A1FREQ", "INFO", "N", "TEST",
+    "BETA", "SE", "CHISQ", "LOG10P", "EXTRA"
+]
+
+# Explicit parser dtypes; GENPOS is a nullable integer so missing or NA
+# positions parse, and CHROM, EXTRA and the statistics are left to inference
+DISCOVERY_DTYPES = {
+    "GENPOS": pd.Int64Dtype(),
+    "ID": str, "ALLELE0": str, "ALLELE1": str, "TEST": str,
+}
+
+# Statistics coerced to floats after loading; non-parsable values become NaN
+DISCOVERY_NUMERIC_COLS = [
+    "A1FREQ", "INFO", "N", "BETA", "SE", "CHISQ", "LOG10P"
+]
+
+
 def load_discovery() -> pd.DataFrame:
     """
     Read every file in the current directory whose filename has
@@ -50,30 +71,26 @@ def load_discovery() -> pd.DataFrame:
             "No extension-less files were found in the current directory."
         )
 
-    frames: list[pd.DataFrame] = []
+    # Collect per-column series and concatenate each once, instead of
+    # stacking whole per-file frames with pd.concat
+    columns: dict[str, list[pd.Series]] = {c: [] for c in DISCOVERY_COLS}
     for fp in extensionless:
         df = pd.read_csv(
             fp,
             sep=r"\s+",
             header=None,   # raw files lack a header row
             skiprows=1,    # begin reading from the 2nd line
+            names=DISCOVERY_COLS,
+            dtype=DISCOVERY_DTYPES,
             engine="c"
         )
-        frames.append(df)
+        for col in DISCOVERY_COLS:
+            columns[col].append(df[col])
 
-    discovery = pd.concat(frames, ignore_index=True)
-
-    discovery.columns = [
-        "CHROM", "GENPOS", "ID",
-        "ALLELE0", "ALLELE1",
-        "A1FREQ", "INFO", "N", "TEST",
-        "BETA", "SE", "CHISQ", "LOG10P", "EXTRA"
-    ]
+    discovery = pd.DataFrame({col: pd.concat(parts, ignore_index=True)
+                              for col, parts in columns.items()})
 
-    # Force numeric columns; non-parsable values become NaN
-    numeric_cols = ["GENPOS", "A1FREQ", "INFO", "N",
-                    "BETA", "SE", "CHISQ", "LOG10P"]
-    discovery[numeric_cols] = discovery[numeric_cols].apply(
+    discovery[DISCOVERY_NUMERIC_COLS] = discovery[DISCOVERY_NUMERIC_COLS].apply(
         pd.to_numeric, errors="coerce"
     )
 
@@ -106,59 +123,89 @@ def load_assoc(path: str | Path, p_threshold: float = 1e-4) -> pd.DataFrame:
         "beta", "se", "p_wald", "pip_susie"
     ]
 
-    assoc = pd.read_csv(
+    reader = pd.read_csv(
         path,
         sep=r"\s+",
         header=0,        # first line already contains a header
         names=assoc_cols,
-        engine="c"
+        dtype={"p_wald": np.float32},
+        engine="c",
+        chunksize=200_000
     )
 
-    assoc = assoc[assoc["p_wald"] < p_threshold].copy()
+    # Filter chunk by chunk so only the retained rows are ever held
+    parts = [chunk[chunk["p_wald"] < p_threshold] for chunk in reader]
+    assoc = pd.concat(parts, ignore_index=True)
     assoc["beta"] = pd.to_numeric(assoc["beta"], errors="coerce")
 
     return assoc
 
 
 # ---------------------------------------------------------------------
-# 3 & 4. Merge tables and compute Pearson correlation
+# 3 & 4. Match tables and compute Pearson correlation
 # ---------------------------------------------------------------------
 def compute_correlation(
     discovery: pd.DataFrame,
     assoc: pd.DataFrame,
 ) -> None:
     """
-    Merge `discovery` and `assoc` on genomic coordinates and alleles,
+    Match `discovery` and `assoc` on genomic coordinates and alleles,
     then report the Pearson correlation between effect sizes.
 
     Raises
     ------
     ValueError
-        If there is no overlap or fewer than two valid SNPs.
+        If there is no overlap or fewer than two valid SNPs remain.
     """
-    merged = discovery.merge(
-        assoc,
-        left_on=["CHROM", "GENPOS", "ALLELE0", "ALLELE1"],
-        right_on=["chr",   "ps",     "allele0", "allele1"],
-        how="inner",
-        suffixes=("_disc", "_assoc")
-    )
+    disc_cols = ["CHROM", "GENPOS", "ALLELE0", "ALLELE1"]
+    assoc_cols = ["chr", "ps", "allele0", "allele1"]
+
+    # One hash lookup over the composite key instead of a 4-column merge
+    disc_key = pd.MultiIndex.from_arrays([discovery[c] for c in disc_cols])
+    if disc_key.is_unique:
+        assoc_key = pd.MultiIndex.from_arrays([assoc[c] for c in assoc_cols])
+        pos = disc_key.get_indexer(assoc_key)
+        disc_rows = pos[pos >= 0]
+        assoc_rows = np.flatnonzero(pos >= 0)
+    else:
+        # Duplicated discovery keys pair with every matching assoc row,
+        # exactly as the inner merge does
+        pairs = discovery[disc_cols].assign(_disc_row=np.arange(len(discovery))).merge(
+            assoc[assoc_cols].assign(_assoc_row=np.arange(len(assoc))),
+            left_on=disc_cols,
+            right_on=assoc_cols,
+            how="inner"
+        )
+        disc_rows = pairs["_disc_row"].to_numpy()
+        assoc_rows = pairs["_assoc_row"].to_numpy()
 
-    if merged.empty:
+    if disc_rows.size == 0:
         raise ValueError(
             "No overlap between discovery and assoc on the specified keys."
         )
 
-    subset = merged[["BETA", "beta"]].dropna()
-    if subset.shape[0] < 2:
+    beta_disc = discovery["BETA"].to_numpy(dtype=np.float64)[disc_rows]
+    beta_assoc = assoc["beta"].to_numpy(dtype=np.float64)[assoc_rows]
+    valid = ~(np.isnan(beta_disc) | np.isnan(beta_assoc))
+    beta_disc, beta_assoc = beta_disc[valid], beta_assoc[valid]
+    if beta_disc.size < 2:
         raise ValueError(
             "Not enough overlapping SNPs with valid effect sizes to "
             "compute a Pearson correlation."
         )
 
-    r, p_val = pearsonr(subset["BETA"], subset["beta"])
-
-    print(f"Number of overlapping SNPs : {subset.shape[0]}")
+    # r from one corrcoef call; two-sided p from the t statistic on n - 2 df.
+    # Two points always lie on a line, so as with pearsonr p is 1 there
+    n = beta_disc.size
+    r = float(np.clip(np.corrcoef(beta_disc, beta_assoc)[0, 1], -1.0, 1.0))
+    if n == 2:
+        p_val = 1.0
+    else:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = r * np.sqrt((n - 2) / (1.0 - r * r))
+        p_val = 2.0 * stdtr(n - 2, -abs(t))
+
+    print(f"Number of overlapping SNPs : {n}")
     print(f"Pearson r                  : {r: .5f}")
     print(f"p-value                    : {p_val: .3e}")
 
@@ -7,61 +7,77 @@ and write any missing files to missing_files.csv.
 """
 
 import csv
+import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
 from pathlib import Path
 
+PLOT_EXPECTED = [
+    "all_Manhattan.png",
+    "all_qqplot.png",
+    "female_Manhattan.png",
+    "female_qqplot.png",
+    "male_Manhattan.png",
+    "male_qqplot.png",
+]
+OUTPUT_EXPECTED = [
+    "sig_summ_all2.assoc.tsv",
+    "sig_summ_female2.assoc.tsv",
+    "sig_summ_male2.assoc.tsv",
+    "summ_all2.assoc.txt.gz",
+    "summ_female2.assoc.txt.gz",
+    "summ_male2.assoc.txt.gz",
+]
+
+
+def _list_files(directory: Path) -> set[str]:
+    """
+    Return the names of regular files in `directory` (empty if it is absent).
+    """
+    try:
+        with os.scandir(directory) as entries:
+            return {e.name for e in entries if e.is_file()}
+    except (FileNotFoundError, NotADirectoryError):
+        return set()
+
+
+def _check_study(study_dir: Path) -> list[dict]:
+    """
+    Return the missing-file records for one study directory.
+    """
+    missing = []
+    # One directory read per subdirectory instead of a stat per file
+    for sub, expected in (("plot", PLOT_EXPECTED), ("output", OUTPUT_EXPECTED)):
+        sub_dir = study_dir / sub
+        present = _list_files(sub_dir)
+        for filename in expected:
+            if filename not in present:
+                missing.append({
+                    "directory": str(sub_dir),
+                    "missing_file": filename,
+                })
+    return missing
+
 
-def find_missing_files(base_dir: Path) -> list[dict]:
+def find_missing_files(base_dir: Path, max_workers: int = 32) -> list[dict]:
     """
     Traverse each subdirectory of base_dir and check for expected files
     in 'plot' and 'output' subdirectories. Return a list of dicts
     recording any missing files.
-    """
-    plot_expected = [
-        "all_Manhattan.png",
-        "all_qqplot.png",
-        "female_Manhattan.png",
-        "female_qqplot.png",
-        "male_Manhattan.png",
-        "male_qqplot.png",
-    ]
-    output_expected = [
-        "sig_summ_all2.assoc.tsv",
-        "sig_summ_female2.assoc.tsv",
-        "sig_summ_male2.assoc.tsv",
-        "summ_all2.assoc.txt.gz",
-        "summ_female2.assoc.txt.gz",
-        "summ_male2.assoc.txt.gz",
-    ]
-
-    missing = []
 
+    Study directories are checked on a thread pool so that metadata
+    round-trips on the parallel file system overlap.
+    """
     if not base_dir.is_dir():
         raise NotADirectoryError(f"{base_dir} does not exist or is not a directory")
 
-    for study_dir in base_dir.iterdir():
-        if not study_dir.is_dir():
-            continue
+    with os.scandir(base_dir) as entries:
+        study_dirs = [Path(e.path) for e in entries if e.is_dir()]
 
-        # Check the 'plot' subdirectory
-        plot_dir = study_dir / "plot"
-        for filename in plot_expected:
-            if not (plot_dir / filename).is_file():
-                missing.append({
-                    "directory": str(plot_dir),
-                    "missing_file": filename,
-                })
-
-        # Check the 'output' subdirectory
-        output_dir = study_dir / "output"
-        for filename in output_expected:
-            if not (output_dir / filename).is_file():
-                missing.append({
-                    "directory": str(output_dir),
-                    "missing_file": filename,
-                })
-
-    return missing
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(_check_study, study_dirs)
+        return list(chain.from_iterable(results))
 
 
 def write_missing_to_csv(missing: list[dict], csv_path: Path) -> None:
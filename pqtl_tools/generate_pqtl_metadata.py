@@ -18,6 +18,19 @@ import argparse
 from datetime import datetime
 from collections import defaultdict
 
+def _sorted_names(dir_path):
+    """
+    Return the sorted entry names of dir_path, or [] if it is not a
+    directory; one scandir call replaces the isdir + listdir pair.
+    """
+    try:
+        with os.scandir(dir_path) as it:
+            names = [e.name for e in it]
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+    names.sort()
+    return names
+
 def scan_pqtl_share(root_dir):
     """
     Scan first‐level subdirectories under root_dir, group them by
@@ -25,10 +38,11 @@ def scan_pqtl_share(root_dir):
     Returns a dict: { letter: [ protein_info, ... ], ... }
     """
     groups = defaultdict(list)
-    for entry in os.listdir(root_dir):
-        path = os.path.join(root_dir, entry)
-        if not os.path.isdir(path):
-            continue
+    with os.scandir(root_dir) as it:
+        dir_entries = [e for e in it if e.is_dir()]
+    for dir_entry in dir_entries:
+        entry = dir_entry.name
+        path = dir_entry.path
         if not entry:
             continue
         first = entry[0].lower()
@@ -40,12 +54,8 @@ def scan_pqtl_share(root_dir):
             "output_files": [],
             "plot_files": []
         }
-        out_dir = os.path.join(path, "output")
-        if os.path.isdir(out_dir):
-            info["output_files"] = sorted(os.listdir(out_dir))
-        plot_dir = os.path.join(path, "plot")
-        if os.path.isdir(plot_dir):
-            info["plot_files"] = sorted(os.listdir(plot_dir))
+        info["output_files"] = _sorted_names(os.path.join(path, "output"))
+        info["plot_files"] = _sorted_names(os.path.join(path, "plot"))
         groups[first].append(info)
     # Sort each group's protein list by name
     for letter in groups:
@@ -15,20 +15,21 @@ listing the subdirectory and the missing file(s).
 """
 
 import csv
+import os
 from pathlib import Path
 
 # Root directory containing pqtl project subfolders
 BASE_DIR = Path("/gpfs/chencao/ysbioinfor/project/proteohubProject/web_out/pqtl")
 
-# List of expected files in each 'plot' directory
-EXPECTED_FILES = [
+# Expected files in each 'plot' directory (tuple keeps report order stable)
+EXPECTED_FILES = (
     "all_Manhattan.png",
     "all_qqplot.png",
     "female_Manhattan.png",
     "female_qqplot.png",
     "male_Manhattan.png",
     "male_qqplot.png",
-]
+)
 
 # Name of the output CSV file
 OUTPUT_CSV = "missing_files.csv"
@@ -36,38 +37,36 @@ OUTPUT_CSV = "missing_files.csv"
 def main():
     missing_records = []
 
-    # Iterate over each item in the base directory
-    for subdir in BASE_DIR.iterdir():
-        if not subdir.is_dir():
-            # Skip if it's not a directory
-            continue
+    # Iterate over each subdirectory of the base directory; DirEntry type
+    # checks reuse the d_type from readdir instead of a stat per entry
+    with os.scandir(BASE_DIR) as it:
+        subdirs = [e for e in it if e.is_dir()]
 
-        plot_dir = subdir / "plot"
-        if not plot_dir.is_dir():
+    for subdir in subdirs:
+        # One readdir of 'plot' replaces a stat() per expected file
+        try:
+            with os.scandir(os.path.join(subdir.path, "plot")) as it:
+                present = {e.name for e in it if e.is_file()}
+        except (FileNotFoundError, NotADirectoryError):
             # If the 'plot' directory is missing, mark all expected files as missing
             for fname in EXPECTED_FILES:
-                missing_records.append({
-                    "folder": subdir.name,
-                    "missing_file": f"plot/ (directory missing), expected {fname}"
-                })
+                missing_records.append(
+                    (subdir.name, f"plot/ (directory missing), expected {fname}")
+                )
             continue
 
         # Check each expected file
         for fname in EXPECTED_FILES:
-            file_path = plot_dir / fname
-            if not file_path.is_file():
-                missing_records.append({
-                    "folder": subdir.name,
-                    "missing_file": fname
-                })
+            if fname not in present:
+                missing_records.append((subdir.name, fname))
 
-    # Write the missing file records to CSV
-    with open(OUTPUT_CSV, mode="w", newline="", encoding="utf-8") as csvfile:
-        fieldnames = ["folder", "missing_file"]
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        for record in missing_records:
-            writer.writerow(record)
+    # Write the (folder, missing_file) records to CSV in one writerows call;
+    # csv.writer still quotes the "directory missing, expected ..." entries
+    with open(OUTPUT_CSV, mode="w", newline="", encoding="utf-8",
+              buffering=1 << 20) as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(["folder", "missing_file"])
+        writer.writerows(missing_records)
 
     print(f"Check completed: found {len(missing_records)} missing file records.")
     print(f"See details in: {OUTPUT_CSV}")
@@ -8,17 +8,25 @@ processing for optimal performance.
 """
 
 import os
-import gzip
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pacsv
 from pathlib import Path
 from typing import List, Dict, Tuple, Optional
 import multiprocessing as mp
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
 from functools import partial
 import logging
 from datetime import datetime
 import warnings
 
+try:
+    from isal import igzip  # ISA-L inflate, ~1.5x faster than zlib here
+except ImportError:
+    igzip = None
+
 # Suppress pandas warnings for cleaner output
 warnings.filterwarnings('ignore')
 
@@ -30,6 +38,23 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Compact types for the association columns: narrow integers and
+# dictionary-encoded alleles shrink the table before the merge. Effect
+# statistics stay float64 so the merged CSVs keep full precision. 'chr' is
+# left to inference, as files may carry X/Y/MT codes next to numeric ones.
+ASSOC_COLUMN_TYPES = {
+    'ps': pa.uint32(),
+    'n_miss': pa.uint16(),
+    'allele1': pa.dictionary(pa.int32(), pa.string()),
+    'allele0': pa.dictionary(pa.int32(), pa.string()),
+}
+
+# Join keys of the significant-hits CSV
+HITS_COLUMN_TYPES = {
+    'snp_name': pa.string(),
+    'protein': pa.string(),
+}
+
 
 class ProteoQTLMerger:
     """
@@ -86,9 +111,22 @@ class ProteoQTLMerger:
             DataFrame containing the file contents, or None if error
         """
         try:
-            with gzip.open(filepath, 'rt') as f:
-                df = pd.read_csv(f, sep='\t', low_memory=False)
-            return df
+            # Inflate with ISA-L when available, otherwise let Arrow detect
+            # gzip from the extension; Arrow parses on its own thread pool.
+            # self_destruct releases Arrow buffers as columns are converted,
+            # so the table and frame are not both held
+            if igzip is not None:
+                source = igzip.open(filepath, 'rb')
+            else:
+                source = pa.input_stream(str(filepath), compression='detect')
+            with source:
+                table = pacsv.read_csv(
+                    source,
+                    read_options=pacsv.ReadOptions(use_threads=True),
+                    parse_options=pacsv.ParseOptions(delimiter='\t'),
+                    convert_options=pacsv.ConvertOptions(column_types=ASSOC_COLUMN_TYPES)
+                )
+            return table.to_pandas(split_blocks=True, self_destruct=True)
         except Exception as e:
             logger.error(f"Error reading {filepath}: {str(e)}")
             return None
@@ -98,10 +136,11 @@ class ProteoQTLMerger:
         Process a single protein group by merging CSV data with association statistics.
         
         Args:
-            args: Tuple containing (protein_name, protein_df, txt_filename)
+            args: Tuple containing (protein_name, protein_df, txt_filename);
+                protein_df must be sorted by snp_name
             
         Returns:
-            Merged DataFrame for the protein
+            Merged DataFrame for the protein, sorted by snp_name
         """
         protein_name, protein_df, txt_filename = args
         
@@ -119,18 +158,20 @@ class ProteoQTLMerger:
             logger.warning(f"Empty or invalid association file for protein: {protein_name}")
             return protein_df
         
+        # Keep only the rows the left join can match, so the merge works on
+        # this protein's hits rather than the genome-wide table; 'rs' is
+        # renamed to the join key so the merge emits no redundant column
+        assoc_df = assoc_df[assoc_df['rs'].isin(protein_df['snp_name'])]
+        assoc_df = assoc_df.rename(columns={'rs': 'snp_name'})
+        
         # Merge on SNP names
         merged_df = protein_df.merge(
             assoc_df,
-            left_on='snp_name',
-            right_on='rs',
-            how='left'
+            on='snp_name',
+            how='left',
+            sort=False   # left order is kept, so rows stay sorted by snp_name
         )
         
-        # Remove duplicate 'rs' column as it's redundant with 'snp_name'
-        if 'rs' in merged_df.columns:
-            merged_df = merged_df.drop(columns=['rs'])
-        
         return merged_df
     
     def process_dataset(self, dataset_type: str) -> None:
@@ -153,40 +194,121 @@ class ProteoQTLMerger:
             return
         
         logger.info(f"Reading CSV file: {csv_file}")
-        csv_df = pd.read_csv(csv_file)
+        # Parsed by Arrow's threaded reader like the association files; the
+        # key columns are pinned to strings so IDs are never type-inferred.
+        # Sorting by (protein, snp_name) here, with Arrow's multithreaded
+        # stable sort, leaves every protein's rows already in output order
+        csv_df = pacsv.read_csv(
+            str(csv_file),
+            convert_options=pacsv.ConvertOptions(column_types=HITS_COLUMN_TYPES)
+        ).sort_by([('protein', 'ascending'), ('snp_name', 'ascending')]).to_pandas()
         
-        # Get unique proteins
-        unique_proteins = csv_df['protein'].unique()
+        # The sort leaves each protein's rows contiguous (missing proteins
+        # last), so the group boundaries are where the key changes and every
+        # group is a row slice of csv_df rather than a copy
+        proteins = csv_df['protein'].to_numpy()[:csv_df['protein'].count()]
+        starts = np.flatnonzero(np.r_[True, proteins[1:] != proteins[:-1]]) \
+            if len(proteins) else np.empty(0, dtype=np.intp)
+        stops = np.r_[starts[1:], len(proteins)]
+        unique_proteins = proteins[starts].tolist()
         logger.info(f"Found {len(unique_proteins)} unique proteins")
         
         # Prepare arguments for parallel processing
-        process_args = []
-        for protein in unique_proteins:
-            protein_df = csv_df[csv_df['protein'] == protein].copy()
-            process_args.append((protein, protein_df, txt_filename))
-        
-        # Process proteins in parallel
-        logger.info(f"Starting parallel processing with {self.n_cores} cores...")
-        with mp.Pool(processes=self.n_cores) as pool:
-            results = pool.map(self.process_protein_group, process_args)
+        process_args = [(protein, csv_df.iloc[start:stop], txt_filename)
+                        for protein, start, stop in zip(unique_proteins, starts, stops)]
         
-        # Combine results
-        logger.info("Combining results...")
-        merged_df = pd.concat(results, ignore_index=True)
-        
-        # Sort by protein and SNP name for consistency
-        merged_df = merged_df.sort_values(['protein', 'snp_name'])
-        
-        # Save the merged results
+        # Process proteins in parallel. Threads share csv_df instead of
+        # pickling each protein's rows to a worker process; gzip inflate and
+        # Arrow's CSV parser release the GIL, so the reads still overlap.
+        # Groups are yielded in protein order, each sorted by snp_name, and
+        # appended to the output as they arrive; at most 2 * n_cores proteins
+        # are in flight, so a slow protein cannot make finished frames pile up
+        logger.info(f"Starting parallel processing with {self.n_cores} threads...")
         logger.info(f"Saving merged results to: {output_file}")
-        merged_df.to_csv(output_file, index=False)
+        total_rows = 0
+        matched_rows = 0
+        columns = None   # csv columns + association columns, once known
+        pending = []     # groups seen before any association file was read
+        with ThreadPoolExecutor(max_workers=self.n_cores) as executor, \
+                open(output_file, 'w') as fh:
+            for merged_df in self._merge_in_order(executor, process_args, 2 * self.n_cores):
+                total_rows += len(merged_df)
+                if 'chr' in merged_df.columns:
+                    # Counted on the raw array: an integer column means every
+                    # row matched, otherwise NaN marks SNPs without a match
+                    chrom = merged_df['chr'].to_numpy()
+                    if chrom.dtype.kind == 'f':
+                        matched_rows += chrom.size - np.count_nonzero(np.isnan(chrom))
+                    elif chrom.dtype.kind in 'iu':
+                        matched_rows += chrom.size
+                    else:
+                        matched_rows += int(merged_df['chr'].notna().sum())
+                
+                if columns is None:
+                    if len(merged_df.columns) == len(csv_df.columns):
+                        pending.append(merged_df)
+                        continue
+                    columns = merged_df.columns
+                    for df in pending:
+                        self._write_group(df, columns, csv_df.columns, fh)
+                    pending = []
+                self._write_group(merged_df, columns, csv_df.columns, fh)
+            
+            # No association file was found for any protein
+            for df in pending:
+                self._write_group(df, csv_df.columns, csv_df.columns, fh)
         
         # Log summary statistics
-        total_rows = len(merged_df)
-        matched_rows = merged_df['chr'].notna().sum() if 'chr' in merged_df.columns else 0
         logger.info(f"Dataset {dataset_type} complete: {total_rows} total rows, "
                    f"{matched_rows} rows with association data")
     
+    def _merge_in_order(self, executor: ThreadPoolExecutor, process_args: List[Tuple],
+                        window: int):
+        """
+        Yield process_protein_group results in input order.
+        
+        Unlike executor.map, which submits every protein up front, only
+        ``window`` proteins are submitted at a time and the next one is
+        submitted as each result is taken.
+        
+        Args:
+            executor: Executor running the merges
+            process_args: Arguments for process_protein_group, in output order
+            window: Maximum number of proteins in flight
+        """
+        args_iter = iter(process_args)
+        in_flight = deque(executor.submit(self.process_protein_group, args)
+                          for _, args in zip(range(window), args_iter))
+        while in_flight:
+            merged_df = in_flight.popleft().result()
+            args = next(args_iter, None)
+            if args is not None:
+                in_flight.append(executor.submit(self.process_protein_group, args))
+            yield merged_df
+    
+    @staticmethod
+    def _write_group(df: pd.DataFrame, columns: pd.Index, csv_columns: pd.Index,
+                     fh) -> None:
+        """
+        Append one protein's merged rows to the open output file.
+        
+        Rows are aligned to the full column set, and integer association
+        columns are written as floats, so every group is formatted as it
+        would be in a single concatenated frame where unmatched SNPs are NaN.
+        
+        Args:
+            df: Merged rows for one protein
+            columns: Output column order
+            csv_columns: Columns of the significant-hits CSV
+            fh: Open output file handle; the header is written if it is empty
+        """
+        df = df.reindex(columns=columns)
+        int_cols = [c for c in columns
+                    if c not in csv_columns and df[c].dtype.kind in 'iu']
+        if int_cols:
+            df = df.astype({c: 'float64' for c in int_cols})
+        df.to_csv(fh, header=fh.tell() == 0, index=False)
+    
     def run(self) -> None:
         """
         Execute the complete merging process for all datasets.
@@ -6,9 +6,10 @@ Checks all protein folders for required output and plot files.
 
 import os
 import glob
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 import sys
 
 # Define required files for each subdirectory
@@ -42,6 +43,8 @@ BASE_DIR = '/gpfs/chencao/ysbioinfor/project/proteohubProject/web_out/pqtl'
 
 # Cutoff date: September 1, 2025
 CUTOFF_DATE = datetime(2025, 9, 1)
+# Same cutoff as a POSIX timestamp, compared directly against st_mtime
+CUTOFF_TS = CUTOFF_DATE.timestamp()
 
 
 class FileValidator:
@@ -55,8 +58,10 @@ class FileValidator:
             base_dir: Base directory containing protein folders
         """
         self.base_dir = Path(base_dir)
+        self._base_path = str(self.base_dir)
         self.missing_files = {}
         self.outdated_files = {}
+        self._protein_folders = []
         
     def get_protein_folders(self) -> List[str]:
         """
@@ -73,23 +78,23 @@ class FileValidator:
             print(f"Error accessing base directory: {e}")
             return []
     
-    def check_file_modification_time(self, file_path: Path) -> bool:
+    @staticmethod
+    def _stat_mtime(path) -> Optional[float]:
         """
-        Check if file modification time is after the cutoff date
+        Stat a file once for both the existence and the mtime check
         
         Args:
-            file_path: Path to the file
+            path: Path or os.DirEntry of the file
             
         Returns:
-            True if file is modified after cutoff date, False otherwise
+            The file's st_mtime, or None if it cannot be stat()ed
         """
         try:
-            mtime = datetime.fromtimestamp(file_path.stat().st_mtime)
-            return mtime >= CUTOFF_DATE
-        except Exception:
-            return False
+            return path.stat().st_mtime
+        except OSError:
+            return None
     
-    def validate_protein_folder(self, protein_name: str) -> Tuple[List[str], List[str]]:
+    def validate_protein_folder(self, protein_name: str) -> Tuple[str, List[str], List[str]]:
         """
         Validate files in a single protein folder
         
@@ -97,31 +102,44 @@ class FileValidator:
             protein_name: Name of the protein (folder name)
             
         Returns:
-            Tuple of (missing_files, outdated_files)
+            Tuple of (protein_name, missing_files, outdated_files)
         """
-        protein_path = self.base_dir / protein_name
+        protein_path = os.path.join(self._base_path, protein_name)
         missing = []
         outdated = []
         
         for subdir, required_files in REQUIRED_FILES.items():
-            subdir_path = protein_path / subdir
+            # One readdir per subdirectory; only required entries are stat()ed
+            try:
+                with os.scandir(os.path.join(protein_path, subdir)) as it:
+                    entries = {e.name: e for e in it}
+            except OSError:
+                entries = {}
             
             for file_name in required_files:
-                file_path = subdir_path / file_name
-                
-                if not file_path.exists():
+                entry = entries.get(file_name)
+                # Absent from the listing, or not stat()able (e.g. a dangling symlink)
+                st_mtime = self._stat_mtime(entry) if entry else None
+                if st_mtime is None:
                     missing.append(f"{subdir}/{file_name}")
-                elif not self.check_file_modification_time(file_path):
-                    mtime = datetime.fromtimestamp(file_path.stat().st_mtime)
+                    continue
+                if st_mtime < CUTOFF_TS:
+                    # datetime is only built for the (rare) outdated files
+                    mtime = datetime.fromtimestamp(st_mtime)
                     outdated.append(f"{subdir}/{file_name} (modified: {mtime.strftime('%Y-%m-%d %H:%M:%S')})")
         
-        return missing, outdated
+        return protein_name, missing, outdated
     
-    def validate_all_proteins(self):
+    def validate_all_proteins(self, max_workers: int = 64):
         """
         Validate all protein folders and collect issues
+        
+        Args:
+            max_workers: Number of threads issuing stat() calls concurrently;
+                on a network filesystem the checks are latency-bound
         """
         protein_folders = self.get_protein_folders()
+        self._protein_folders = protein_folders
         
         if not protein_folders:
             print("No protein folders found in the base directory.")
@@ -130,13 +148,14 @@ class FileValidator:
         print(f"Found {len(protein_folders)} protein folders to check...")
         print("-" * 80)
         
-        for protein_name in protein_folders:
-            missing, outdated = self.validate_protein_folder(protein_name)
-            
-            if missing:
-                self.missing_files[protein_name] = missing
-            if outdated:
-                self.outdated_files[protein_name] = outdated
+        # Workers only return results; the dicts are filled in this thread
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(self.validate_protein_folder, protein_folders)
+            for protein_name, missing, outdated in results:
+                if missing:
+                    self.missing_files[protein_name] = missing
+                if outdated:
+                    self.outdated_files[protein_name] = outdated
     
     def generate_report(self):
         """
@@ -179,7 +198,7 @@ class FileValidator:
         print("\n" + "=" * 80)
         print("SUMMARY STATISTICS")
         print("=" * 80)
-        total_proteins = len(self.get_protein_folders())
+        total_proteins = len(self._protein_folders)
         proteins_with_issues = len(set(list(self.missing_files.keys()) + 
                                       list(self.outdated_files.keys())))
         proteins_complete = total_proteins - proteins_with_issues
@@ -203,28 +222,33 @@ class FileValidator:
         Args:
             output_file: Name of the output file
         """
+        # Build the report in memory and write it in one call
+        parts = [
+            "pQTL File Validation Report\n",
+            f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n",
+            f"Base directory: {self.base_dir}\n",
+            f"Cutoff date: {CUTOFF_DATE.strftime('%Y-%m-%d')}\n",
+            "=" * 80 + "\n\n",
+        ]
+        
+        if self.missing_files:
+            parts.append("MISSING FILES\n")
+            parts.append("-" * 40 + "\n")
+            for protein_name, files in sorted(self.missing_files.items()):
+                parts.append(f"\nProtein: {protein_name}\n")
+                parts.extend(f"  {self.base_dir}/{protein_name}/{file_name}\n"
+                             for file_name in files)
+        
+        if self.outdated_files:
+            parts.append("\n\nOUTDATED FILES\n")
+            parts.append("-" * 40 + "\n")
+            for protein_name, files in sorted(self.outdated_files.items()):
+                parts.append(f"\nProtein: {protein_name}\n")
+                parts.extend(f"  {self.base_dir}/{protein_name}/{file_info}\n"
+                             for file_info in files)
+        
         with open(output_file, 'w') as f:
-            f.write(f"pQTL File Validation Report\n")
-            f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write(f"Base directory: {self.base_dir}\n")
-            f.write(f"Cutoff date: {CUTOFF_DATE.strftime('%Y-%m-%d')}\n")
-            f.write("=" * 80 + "\n\n")
-            
-            if self.missing_files:
-                f.write("MISSING FILES\n")
-                f.write("-" * 40 + "\n")
-                for protein_name, files in sorted(self.missing_files.items()):
-                    f.write(f"\nProtein: {protein_name}\n")
-                    for file_name in files:
-                        f.write(f"  {self.base_dir}/{protein_name}/{file_name}\n")
-            
-            if self.outdated_files:
-                f.write("\n\nOUTDATED FILES\n")
-                f.write("-" * 40 + "\n")
-                for protein_name, files in sorted(self.outdated_files.items()):
-                    f.write(f"\nProtein: {protein_name}\n")
-                    for file_info in files:
-                        f.write(f"  {self.base_dir}/{protein_name}/{file_info}\n")
+            f.write("".join(parts))
         
         print(f"\nDetailed report exported to: {output_file}")
 
@@ -105,6 +105,32 @@ class MLPClassifier(nn.Module):
     def forward(self, x):
         return self.model(x)
 
+def fuse_bn_linear(model):
+    """
+    Fold each BatchNorm1d into the preceding Linear layer, as train.py does
+    before saving its MLP checkpoints
+    """
+    layers = list(model.model)
+    fused = []
+    i = 0
+    with torch.no_grad():
+        while i < len(layers):
+            layer = layers[i]
+            if (isinstance(layer, nn.Linear) and i + 1 < len(layers)
+                    and isinstance(layers[i + 1], nn.BatchNorm1d)):
+                bn = layers[i + 1]
+                scale = bn.weight / torch.sqrt(bn.running_var + bn.eps)
+                linear = nn.Linear(layer.in_features, layer.out_features).to(layer.weight.device)
+                linear.weight.copy_(layer.weight * scale[:, None])
+                linear.bias.copy_((layer.bias - bn.running_mean) * scale + bn.bias)
+                fused.append(linear)
+                i += 2
+            else:
+                fused.append(layer)
+                i += 1
+    model.model = nn.Sequential(*fused)
+    return model.eval()
+
 def train_pytorch_model(model, train_loader, val_loader, epochs=100, lr=0.001, device='cuda'):
     """
     Train PyTorch model with early stopping
@@ -757,6 +783,12 @@ def load_model_for_inference(target_column, model_type='best', base_path='./mode
     if model_type == 'mlp':
         checkpoint = torch.load(os.path.join(target_path, f'{model_type}_model.pth'))
         model = MLPClassifier(**checkpoint['model_config'])
+        # train.py saves the layer stack with BatchNorm folded into Linear;
+        # the trailing Sigmoid has no parameters, so the keys still line up
+        if checkpoint.get('fused', False):
+            model = fuse_bn_linear(model)
+        if checkpoint.get('quantized', False):
+            model = torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
         model.load_state_dict(checkpoint['model_state_dict'])
         model.eval()
     else:
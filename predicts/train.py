@@ -5,13 +5,24 @@ import pandas as pd
 import numpy as np
 import os
 import pickle
+import shelve
 import joblib
 import json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
 import gc
 from datetime import datetime
 import warnings
 warnings.filterwarnings('ignore')
 import traceback
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 
 if len(sys.argv) < 2:
     print("Usage: python3 my_script.py \"['COLUMN_NAME']\"")
@@ -20,15 +31,34 @@ if len(sys.argv) < 2:
 target_columns = ast.literal_eval(sys.argv[1])
 print("Column running:", target_columns)
 
-proteo_df = pd.read_pickle('f_proteo_train.pkl')
+# The pickle is converted once to an uncompressed float32 Feather file,
+# which later runs memory-map instead of unpickling; the cache is rebuilt
+# whenever the pickle is newer than it
+from pyarrow import feather
+
+PROTEO_PKL = 'f_proteo_train.pkl'
+PROTEO_FEATHER = 'f_proteo_train.feather'
+
+feather_is_current = os.path.exists(PROTEO_FEATHER) and (
+    not os.path.exists(PROTEO_PKL)
+    or os.path.getmtime(PROTEO_PKL) <= os.path.getmtime(PROTEO_FEATHER))
+if feather_is_current:
+    proteo_df = feather.read_table(PROTEO_FEATHER, memory_map=True).to_pandas(
+        split_blocks=True, self_destruct=True)
+else:
+    proteo_df = pd.read_pickle(PROTEO_PKL)
+    proteo_df = proteo_df.astype(
+        {c: 'float32' for c in proteo_df.select_dtypes('float').columns})
+    tmp_path = f'{PROTEO_FEATHER}.{os.getpid()}.tmp'
+    feather.write_feather(proteo_df, tmp_path, compression='uncompressed')
+    os.replace(tmp_path, PROTEO_FEATHER)
 
 # Cell 1: Import necessary libraries
 # Machine Learning
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import StratifiedShuffleSplit
 from sklearn.preprocessing import StandardScaler
 from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import (roc_auc_score, roc_curve, accuracy_score, 
-                           precision_score, recall_score, f1_score, 
+from sklearn.metrics import (roc_auc_score, roc_curve, 
                            confusion_matrix, classification_report)
 import xgboost as xgb
 import lightgbm as lgb
@@ -37,13 +67,19 @@ import lightgbm as lgb
 import torch
 import torch.nn as nn
 import torch.optim as optim
-from torch.utils.data import DataLoader, TensorDataset
+from torch.cuda.amp import autocast, GradScaler
 
 # Hyperparameter Optimization
 import optuna
 from optuna.visualization import plot_optimization_history, plot_param_importances
+try:
+    from optuna.integration import XGBoostPruningCallback, LightGBMPruningCallback
+except ImportError:
+    XGBoostPruningCallback = LightGBMPruningCallback = None
 
 # Visualization
+import matplotlib
+matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 import seaborn as sns
 from sklearn.metrics import auc
@@ -52,6 +88,39 @@ from sklearn.metrics import auc
 np.random.seed(42)
 torch.manual_seed(42)
 
+# Allow TF32 tensor-core matmuls and let cuDNN pick the fastest kernels
+torch.set_float32_matmul_precision('high')
+torch.backends.cudnn.benchmark = True
+
+# Below this many feature cells the GPU transfer and launch overhead
+# outweighs the histogram speed-up, so XGBoost stays on the CPU
+XGB_GPU_MIN_CELLS = 1_000_000
+
+# LightGBM's GPU learner only beats CPU hist on large sample counts
+LGB_GPU_MIN_ROWS = 200_000
+
+# CPU threads budgeted per concurrently trained target (the model fits are
+# themselves multi-threaded)
+TARGET_WORKER_THREADS = 8
+
+# Compact the CUDA caching allocator after every this many targets
+GPU_COMPACT_EVERY = 8
+
+# Fitted models and scalers are saved with fast LZ4 compression when the lz4
+# package is available, and with light zlib compression otherwise
+MODEL_COMPRESS = ('lz4', 1) if lz4 is not None else ('zlib', 1)
+
+# The int8 MLP is saved instead of the float32 one only if its validation
+# AUC-ROC is at most this much lower
+QUANTIZED_AUC_TOLERANCE = 0.005
+
+# Optuna studies are persisted here, one per (model, target) pair
+OPTUNA_STORAGE = 'sqlite:///optuna.db'
+
+# Per-target plots are drawn on one reused figure and saved at this DPI
+PLOT_DPI = 150
+PLOT_FIG = plt.figure()
+
 # GPU Memory Management Function
 def clear_gpu_memory():
     """Clear GPU memory and garbage collect"""
@@ -61,21 +130,17 @@ def clear_gpu_memory():
         torch.cuda.synchronize()
 
 # Cell 2: Data Preparation Functions
-def prepare_data(df, target_column):
+def prepare_features(df):
     """
-    Prepare data for training by separating features and target
+    Extract the float32 feature matrix (all non-PHD columns) and its column names
     """
-    # Identify PHD columns
-    phd_columns = [col for col in df.columns if col.startswith('PHD')]
-    
-    # Features are all columns except PHD columns
-    feature_columns = [col for col in df.columns if col not in phd_columns]
-    
-    # Extract features and target
-    X = df[feature_columns].values
-    y = df[target_column].values
+    is_phd = df.columns.str.startswith('PHD')
+    feature_columns = df.columns[~is_phd].tolist()
+    # DataFrame.to_numpy hands back a column-major array; make it row-major
+    # so per-target row selections are contiguous block copies
+    X = np.ascontiguousarray(df.loc[:, ~is_phd].to_numpy(dtype=np.float32))
     
-    return X, y, feature_columns
+    return X, feature_columns
 
 def split_and_scale_data(X, y, test_size=0.2, random_state=42):
     """
@@ -98,13 +163,16 @@ def split_and_scale_data(X, y, test_size=0.2, random_state=42):
     if len(y) < min_samples_for_split:
         raise ValueError(f"Need at least {min_samples_for_split} samples to split with test_size={test_size}. Got {len(y)} samples.")
     
-    # Split data
-    X_train, X_val, y_train, y_val = train_test_split(
-        X, y, test_size=test_size, random_state=random_state, stratify=y
-    )
+    # Split data; the same indices train_test_split(stratify=y) would pick,
+    # gathered directly without its per-array validation and conversion
+    splitter = StratifiedShuffleSplit(n_splits=1, test_size=test_size, random_state=random_state)
+    train_idx, val_idx = next(splitter.split(X, y))
+    X_train, X_val = X[train_idx], X[val_idx]
+    y_train, y_val = y[train_idx], y[val_idx]
     
-    # Standardize features
-    scaler = StandardScaler()
+    # Standardize features in place; the split arrays are already copies,
+    # and StandardScaler keeps float32 input in float32
+    scaler = StandardScaler(copy=False)
     X_train_scaled = scaler.fit_transform(X_train)
     X_val_scaled = scaler.transform(X_val)
     
@@ -127,21 +195,93 @@ class MLPClassifier(nn.Module):
             ])
             prev_dim = hidden_dim
         
+        # Emits logits; BCEWithLogitsLoss / torch.sigmoid apply the squashing
         layers.append(nn.Linear(prev_dim, 1))
-        layers.append(nn.Sigmoid())
         
         self.model = nn.Sequential(*layers)
     
     def forward(self, x):
         return self.model(x)
 
-def train_pytorch_model(model, train_loader, val_loader, epochs=100, lr=0.001, device='cuda'):
+def fuse_bn_linear(model):
+    """
+    Fold each BatchNorm1d into the preceding Linear layer for inference
+    
+    BatchNorm uses its running statistics in eval mode, so it is an affine map
+    that can be absorbed into the Linear weights and bias. The model is
+    modified in place and returned in eval mode.
+    """
+    layers = list(model.model)
+    fused = []
+    i = 0
+    with torch.no_grad():
+        while i < len(layers):
+            layer = layers[i]
+            if (isinstance(layer, nn.Linear) and i + 1 < len(layers)
+                    and isinstance(layers[i + 1], nn.BatchNorm1d)):
+                bn = layers[i + 1]
+                scale = bn.weight / torch.sqrt(bn.running_var + bn.eps)
+                linear = nn.Linear(layer.in_features, layer.out_features).to(layer.weight.device)
+                linear.weight.copy_(layer.weight * scale[:, None])
+                linear.bias.copy_((layer.bias - bn.running_mean) * scale + bn.bias)
+                fused.append(linear)
+                i += 2
+            else:
+                fused.append(layer)
+                i += 1
+    model.model = nn.Sequential(*fused)
+    return model.eval()
+
+def train_pytorch_model_with_retry(model, *args, **kwargs):
+    """
+    train_pytorch_model, retried once from the initial weights after a CUDA
+    out-of-memory error with the cached allocator blocks released
+    """
+    initial_state = {k: v.detach().clone() for k, v in model.state_dict().items()}
+    try:
+        return train_pytorch_model(model, *args, **kwargs)
+    except torch.cuda.OutOfMemoryError:
+        clear_gpu_memory()
+        model.load_state_dict(initial_state)
+        return train_pytorch_model(model, *args, **kwargs)
+
+def train_pytorch_model(model, X_train, y_train, X_val, y_val, batch_size=64,
+                        epochs=100, lr=0.001, device='cuda', trial=None, compile_model=False):
     """
     Train PyTorch model with early stopping
+    
+    The train/validation arrays are moved to the device once and batches are
+    sliced there from a per-epoch permutation. With an Optuna ``trial``, the
+    negated validation loss is reported each epoch so the study can prune it.
+    ``compile_model`` compiles the training step, which only pays off for long
+    runs of one architecture, not for short Optuna trials.
     """
+    device = torch.device(device)
+    use_amp = device.type == 'cuda'
     model = model.to(device)
-    criterion = nn.BCELoss()
+    
+    X_train_t = torch.as_tensor(X_train, dtype=torch.float32, device=device)
+    y_train_t = torch.as_tensor(y_train, dtype=torch.float32, device=device)
+    X_val_t = torch.as_tensor(X_val, dtype=torch.float32, device=device)
+    y_val_t = torch.as_tensor(y_val, dtype=torch.float32, device=device)
+    
+    # Drop the trailing partial batch when there is more than one batch
+    n_train = X_train_t.size(0)
+    train_stop = n_train - n_train % batch_size if n_train > batch_size else n_train
+    train_starts = range(0, train_stop, batch_size)
+    val_starts = range(0, X_val_t.size(0), batch_size)
+    
+    # Compile the training step for fused kernels and CUDA-graph replay; every
+    # training batch has the same shape, so it is recorded once. ``net`` shares
+    # its parameters with ``model``, which runs validation eagerly and is what
+    # gets saved and returned
+    net = model
+    if compile_model and device.type == 'cuda' and hasattr(torch, 'compile'):
+        net = torch.compile(model, mode='reduce-overhead', fullgraph=True)
+    
+    criterion = nn.BCEWithLogitsLoss()
     optimizer = optim.Adam(model.parameters(), lr=lr)
+    grad_scaler = GradScaler(enabled=use_amp)
     
     best_val_loss = float('inf')
     patience = 10
@@ -154,15 +294,19 @@ def train_pytorch_model(model, train_loader, val_loader, epochs=100, lr=0.001, d
         # Training
         model.train()
         train_loss = 0
-        for X_batch, y_batch in train_loader:
-            X_batch, y_batch = X_batch.to(device), y_batch.to(device)
+        perm = torch.randperm(n_train, device=device)
+        for start in train_starts:
+            idx = perm[start:start + batch_size]
+            X_batch, y_batch = X_train_t[idx], y_train_t[idx]
             
             optimizer.zero_grad()
-            outputs = model(X_batch)
-            outputs = outputs.squeeze(-1)
-            loss = criterion(outputs, y_batch.float())
-            loss.backward()
-            optimizer.step()
+            with autocast(enabled=use_amp):
+                outputs = net(X_batch)
+                outputs = outputs.squeeze(-1)
+                loss = criterion(outputs.float(), y_batch)
+            grad_scaler.scale(loss).backward()
+            grad_scaler.step(optimizer)
+            grad_scaler.update()
             
             train_loss += loss.item()
         
@@ -170,24 +314,33 @@ def train_pytorch_model(model, train_loader, val_loader, epochs=100, lr=0.001, d
         model.eval()
         val_loss = 0
         with torch.no_grad():
-            for X_batch, y_batch in val_loader:
-                X_batch, y_batch = X_batch.to(device), y_batch.to(device)
-                outputs = model(X_batch)
-                outputs = outputs.squeeze(-1)
-                loss = criterion(outputs, y_batch.float())
+            for start in val_starts:
+                X_batch = X_val_t[start:start + batch_size]
+                y_batch = y_val_t[start:start + batch_size]
+                with autocast(enabled=use_amp):
+                    outputs = model(X_batch)
+                    outputs = outputs.squeeze(-1)
+                loss = criterion(outputs.float(), y_batch)
                 val_loss += loss.item()
         
-        avg_train_loss = train_loss / len(train_loader)
-        avg_val_loss = val_loss / len(val_loader)
+        avg_train_loss = train_loss / len(train_starts)
+        avg_val_loss = val_loss / len(val_starts)
         
         train_losses.append(avg_train_loss)
         val_losses.append(avg_val_loss)
         
+        if trial is not None:
+            trial.report(-avg_val_loss, epoch)
+            if trial.should_prune():
+                raise optuna.TrialPruned()
+        
         # Early stopping
         if avg_val_loss < best_val_loss:
             best_val_loss = avg_val_loss
             patience_counter = 0
-            best_model_state = model.state_dict()
+            # state_dict() aliases the live parameters; snapshot a host copy
+            best_model_state = {k: v.detach().to('cpu', copy=True)
+                                for k, v in model.state_dict().items()}
         else:
             patience_counter += 1
             if patience_counter >= patience:
@@ -197,17 +350,93 @@ def train_pytorch_model(model, train_loader, val_loader, epochs=100, lr=0.001, d
     # Load best model
     model.load_state_dict(best_model_state)
     
-    # Clear GPU memory after training
-    del optimizer
-    clear_gpu_memory()
+    # Drop the device copies of the data; their blocks stay cached for the next fit
+    del net, optimizer, X_train_t, y_train_t, X_val_t, y_val_t
     
     return model, train_losses, val_losses
 
+# Thread budget of each model fit when this process is a target worker (see
+# init_target_worker); None leaves every library at its own default
+worker_threads = None
+
+def init_target_worker(n_threads):
+    """Cap a target worker's model fits and torch ops at its share of the CPUs"""
+    global worker_threads
+    worker_threads = n_threads
+    torch.set_num_threads(n_threads)
+
+def n_jobs_param(name='n_jobs'):
+    """Thread-count keyword for a model fit; empty outside target workers"""
+    return {} if worker_threads is None else {name: worker_threads}
+
+def xgb_device_params(X_train):
+    """Return the XGBoost tree_method/device parameters for this training set"""
+    if torch.cuda.is_available() and X_train.size >= XGB_GPU_MIN_CELLS:
+        return {'tree_method': 'hist', 'device': 'cuda'}
+    return {'tree_method': 'hist', **n_jobs_param('nthread')}
+
+def lgb_device_params(X_train):
+    """Return the LightGBM device/threading parameters for this training set"""
+    if torch.cuda.is_available() and X_train.shape[0] > LGB_GPU_MIN_ROWS:
+        return {'device': 'cuda', 'gpu_use_dp': False}
+    # Roughly one thread per physical core; hyper-threads only add contention
+    return {'device': 'cpu', 'n_jobs': worker_threads or max(1, (os.cpu_count() or 2) // 2)}
+
+def gpu_fit_with_retry(fit, *args, **kwargs):
+    """
+    Run an XGBoost/LightGBM fit, retried once after a device out-of-memory
+    error with the cached CUDA blocks released
+    """
+    try:
+        return fit(*args, **kwargs)
+    except (xgb.core.XGBoostError, lgb.basic.LightGBMError) as e:
+        if 'out of memory' not in str(e).lower():
+            raise
+        clear_gpu_memory()
+        return fit(*args, **kwargs)
+
+def predict_mlp_proba(model, X, device=None, batch_size=4096):
+    """
+    Return positive-class probabilities from an MLPClassifier
+    
+    Runs on ``device`` (default: wherever the model lives) in fixed-size
+    chunks so only the probabilities are copied back to the host.
+    """
+    device = torch.device(device) if device is not None else next(model.parameters()).device
+    model = model.to(device).eval()
+    X_t = torch.as_tensor(X, dtype=torch.float32).to(device, non_blocking=True)
+    outs = []
+    with torch.no_grad(), autocast(enabled=device.type == 'cuda'):
+        for start in range(0, X_t.size(0), batch_size):
+            logits = model(X_t[start:start + batch_size]).squeeze(-1)
+            outs.append(torch.sigmoid(logits.float()).cpu())
+    return torch.cat(outs).numpy()
+
 # Cell 4: Hyperparameter Optimization Functions with Error Handling
+def create_study(model_name, target_column):
+    """
+    Create or resume the Optuna study for one model/target pair
+    
+    Studies live in OPTUNA_STORAGE so reruns continue from earlier trials;
+    sampling uses multivariate TPE and weak trials are median-pruned.
+    """
+    storage = optuna.storages.RDBStorage(
+        OPTUNA_STORAGE, engine_kwargs={'connect_args': {'timeout': 30}})
+    return optuna.create_study(
+        study_name=f'{model_name}_{target_column}',
+        storage=storage,
+        load_if_exists=True,
+        direction='maximize',
+        sampler=optuna.samplers.TPESampler(n_startup_trials=5, multivariate=True, group=True),
+        pruner=optuna.pruners.MedianPruner(n_startup_trials=5, n_warmup_steps=10),
+    )
+
 def safe_optimize_function(optimize_func, trial, *args):
     """Wrapper function to safely execute optimization with error handling"""
     try:
         return optimize_func(trial, *args)
+    except optuna.TrialPruned:
+        raise
     except Exception as e:
         print(f"Error in optimization trial: {str(e)}")
         return 0.0  # Return worst possible score
@@ -220,7 +449,7 @@ def optimize_logistic_regression(trial, X_train, y_train, X_val, y_val):
             'penalty': trial.suggest_categorical('penalty', ['l1', 'l2']),
             'solver': 'liblinear' if trial.params['penalty'] == 'l1' else 'lbfgs',
             'max_iter': 300,
-            'n_jobs': -1
+            'n_jobs': 1
         }
         
         model = LogisticRegression(**params)
@@ -231,74 +460,80 @@ def optimize_logistic_regression(trial, X_train, y_train, X_val, y_val):
         
         # Memory cleanup
         del model
-        gc.collect()
         
         return score
     except Exception as e:
         print(f"Error in Logistic Regression optimization: {str(e)}")
         return 0.0
 
-def optimize_xgboost(trial, X_train, y_train, X_val, y_val):
-    """Optuna optimization for XGBoost with GPU"""
+def optimize_xgboost(trial, dtrain, dval, y_val, device_params):
+    """Optuna optimization for XGBoost on a QuantileDMatrix shared across trials"""
     try:
+        n_estimators = trial.suggest_int('n_estimators', 50, 300)
         params = {
-            'n_estimators': trial.suggest_int('n_estimators', 50, 300),
             'max_depth': trial.suggest_int('max_depth', 3, 9),
             'learning_rate': trial.suggest_float('learning_rate', 0.01, 0.3, log=True),
             'subsample': trial.suggest_float('subsample', 0.6, 1.0),
             'colsample_bytree': trial.suggest_float('colsample_bytree', 0.6, 1.0),
             'gamma': trial.suggest_float('gamma', 0.01, 1.0, log=True),
-            'tree_method': 'gpu_hist' if torch.cuda.is_available() else 'hist',
-            'predictor': 'cpu_predictor',
-            'use_label_encoder': False,
-            'eval_metric': 'logloss'
+            'objective': 'binary:logistic',
+            'eval_metric': ['logloss', 'auc']
         }
+        params.update(device_params)
         
-        model = xgb.XGBClassifier(**params)
-        model.fit(X_train, y_train, eval_set=[(X_val, y_val)], verbose=False)
+        # Prune on validation AUC, the same quantity the study maximizes
+        callbacks = []
+        if XGBoostPruningCallback is not None:
+            callbacks.append(XGBoostPruningCallback(trial, 'val-auc'))
         
-        y_pred_proba = model.predict_proba(X_val)[:, 1]
+        model = gpu_fit_with_retry(xgb.train, params, dtrain, num_boost_round=n_estimators,
+                                   evals=[(dval, 'val')], verbose_eval=False, callbacks=callbacks)
+        
+        y_pred_proba = model.predict(dval)
         score = roc_auc_score(y_val, y_pred_proba)
         
         # Memory cleanup
         del model
-        clear_gpu_memory()
         
         return score
+    except optuna.TrialPruned:
+        raise
     except Exception as e:
         print(f"Error in XGBoost optimization: {str(e)}")
         return 0.0
 
-def optimize_lightgbm(trial, X_train, y_train, X_val, y_val):
-    """Optuna optimization for LightGBM with GPU"""
+def optimize_lightgbm(trial, lgb_train, lgb_val, X_val, y_val, device_params):
+    """Optuna optimization for LightGBM on a Dataset shared across trials"""
     try:
+        n_estimators = trial.suggest_int('n_estimators', 50, 300)
         params = {
-            'n_estimators': trial.suggest_int('n_estimators', 50, 300),
+            'objective': 'binary',
+            'metric': ['binary_logloss', 'auc'],
             'num_leaves': trial.suggest_int('num_leaves', 20, 300),
             'max_depth': trial.suggest_int('max_depth', 3, 15),
             'learning_rate': trial.suggest_float('learning_rate', 0.01, 0.3, log=True),
             'feature_fraction': trial.suggest_float('feature_fraction', 0.5, 1.0),
             'bagging_fraction': trial.suggest_float('bagging_fraction', 0.5, 1.0),
         }
+        params.update(device_params)
         
-        if torch.cuda.is_available():
-            params.update({
-                'device': 'gpu',
-                'gpu_use_dp': False,
-            })
+        # Early stopping stays on logloss; pruning follows validation AUC
+        callbacks = [lgb.early_stopping(10, first_metric_only=True), lgb.log_evaluation(0)]
+        if LightGBMPruningCallback is not None:
+            callbacks.append(LightGBMPruningCallback(trial, 'auc'))
         
-        model = lgb.LGBMClassifier(**params)
-        model.fit(X_train, y_train, eval_set=[(X_val, y_val)], 
-                  callbacks=[lgb.early_stopping(10), lgb.log_evaluation(0)])
+        model = gpu_fit_with_retry(lgb.train, params, lgb_train, num_boost_round=n_estimators,
+                                   valid_sets=[lgb_val], callbacks=callbacks)
         
-        y_pred_proba = model.predict_proba(X_val)[:, 1]
+        y_pred_proba = model.predict(X_val, num_iteration=model.best_iteration)
         score = roc_auc_score(y_val, y_pred_proba)
         
         # Memory cleanup
         del model
-        clear_gpu_memory()
         
         return score
+    except optuna.TrialPruned:
+        raise
     except Exception as e:
         print(f"Error in LightGBM optimization: {str(e)}")
         return 0.0
@@ -319,61 +554,63 @@ def optimize_mlp(trial, X_train, y_train, X_val, y_val, input_dim):
         # Ensure batch_size is not larger than dataset size
         batch_size = min(batch_size, len(X_train))
         
-        # Prepare data loaders
-        train_dataset = TensorDataset(torch.FloatTensor(X_train), torch.LongTensor(y_train))
-        val_dataset = TensorDataset(torch.FloatTensor(X_val), torch.LongTensor(y_val))
-        
-        # Set drop_last based on dataset size
-        drop_last = len(train_dataset) > batch_size
-        train_loader = DataLoader(train_dataset, batch_size=batch_size, shuffle=True, drop_last=drop_last)
-        val_loader = DataLoader(val_dataset, batch_size=batch_size, shuffle=False)
-        
         # Create and train model
         device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
         model = MLPClassifier(input_dim, hidden_dims, dropout_rate)
         
-        trained_model, _, _ = train_pytorch_model(model, train_loader, val_loader, 
-                                                 epochs=50, lr=lr, device=device)
+        trained_model, _, _ = train_pytorch_model_with_retry(model, X_train, y_train, X_val, y_val,
+                                                             batch_size=batch_size, epochs=50, lr=lr, device=device,
+                                                             trial=trial)
         
         # Evaluate
-        trained_model.eval()
-        trained_model = trained_model.to('cpu')
-        with torch.no_grad():
-            y_pred_proba = trained_model(torch.FloatTensor(X_val)).squeeze(-1).numpy()
+        y_pred_proba = predict_mlp_proba(trained_model, X_val)
         
         score = roc_auc_score(y_val, y_pred_proba)
         
         # Memory cleanup
         del trained_model, model
-        clear_gpu_memory()
         
         return score
+    except optuna.TrialPruned:
+        raise
     except Exception as e:
         print(f"Error in MLP optimization: {str(e)}")
         return 0.0
 
 # Cell 5: Model Training and Evaluation Functions
-def evaluate_model(model, X_val, y_val, model_name, is_pytorch=False):
+def threshold_metrics(y_true, y_pred_proba, threshold=0.5):
+    """
+    Accuracy, precision, recall and F1 at ``threshold`` from one confusion count
+    
+    Matches sklearn's binary metrics with ``zero_division=0``.
+    """
+    actual = np.asarray(y_true) == 1
+    predicted = np.asarray(y_pred_proba) >= threshold
+    tp = np.count_nonzero(predicted & actual)
+    fp = np.count_nonzero(predicted) - tp
+    fn = np.count_nonzero(actual) - tp
+    tn = actual.size - tp - fp - fn
+    return {
+        'accuracy': (tp + tn) / actual.size,
+        'precision': tp / (tp + fp) if tp + fp else 0.0,
+        'recall': tp / (tp + fn) if tp + fn else 0.0,
+        'f1': 2 * tp / (2 * tp + fp + fn) if tp + fp + fn else 0.0
+    }
+
+def evaluate_model(model, X_val, y_val, model_name, is_pytorch=False, device=None):
     """
     Evaluate model performance and return metrics
     """
     try:
         if is_pytorch:
-            model.eval()
-            with torch.no_grad():
-                y_pred_proba = model(torch.FloatTensor(X_val)).squeeze(-1).numpy()
+            y_pred_proba = predict_mlp_proba(model, X_val, device=device)
         else:
             y_pred_proba = model.predict_proba(X_val)[:, 1]
         
-        y_pred = (y_pred_proba >= 0.5).astype(int)
-        
         metrics = {
             'model': model_name,
             'auc_roc': roc_auc_score(y_val, y_pred_proba),
-            'accuracy': accuracy_score(y_val, y_pred),
-            'precision': precision_score(y_val, y_pred, zero_division=0),
-            'recall': recall_score(y_val, y_pred, zero_division=0),
-            'f1': f1_score(y_val, y_pred, zero_division=0)
+            **threshold_metrics(y_val, y_pred_proba)
         }
         
         fpr, tpr, _ = roc_curve(y_val, y_pred_proba)
@@ -391,11 +628,17 @@ def evaluate_model(model, X_val, y_val, model_name, is_pytorch=False):
             'f1': 0.0
         }, np.array([0, 1]), np.array([0, 1]), np.array([])
 
+def reset_plot_axes(figsize):
+    """Clear the shared figure, resize it and return a fresh axes"""
+    PLOT_FIG.clf()
+    PLOT_FIG.set_size_inches(*figsize)
+    return PLOT_FIG.add_subplot(111)
+
 def plot_roc_curves(results_dict, target_column, save_path):
     """
     Plot ROC curves for all models with error handling
     """
-    plt.figure(figsize=(10, 8))
+    ax = reset_plot_axes((10, 8))
     
     has_valid_models = False
     
@@ -403,30 +646,27 @@ def plot_roc_curves(results_dict, target_column, save_path):
         for result in results_dict.get(model_type, []):
             if 'fpr' in result and 'tpr' in result and len(result['fpr']) > 0:
                 label = f"{result['model']} ({model_type})"
-                plt.plot(result['fpr'], result['tpr'], 
+                ax.plot(result['fpr'], result['tpr'], 
                         label=f"{label} (AUC = {result['metrics']['auc_roc']:.3f})")
                 has_valid_models = True
     
     if has_valid_models:
-        plt.plot([0, 1], [0, 1], 'k--', label='Random')
-        plt.xlim([0.0, 1.0])
-        plt.ylim([0.0, 1.05])
-        plt.xlabel('False Positive Rate')
-        plt.ylabel('True Positive Rate')
-        plt.title(f'ROC Curves - {target_column}')
-        plt.legend(loc="lower right")
-        plt.grid(True, alpha=0.3)
+        ax.plot([0, 1], [0, 1], 'k--', label='Random')
+        ax.set_xlim([0.0, 1.0])
+        ax.set_ylim([0.0, 1.05])
+        ax.set_xlabel('False Positive Rate')
+        ax.set_ylabel('True Positive Rate')
+        ax.set_title(f'ROC Curves - {target_column}')
+        ax.legend(loc="lower right")
+        ax.grid(True, alpha=0.3)
     else:
-        plt.text(0.5, 0.5, 'No valid models to plot', 
+        ax.text(0.5, 0.5, 'No valid models to plot', 
                 horizontalalignment='center', verticalalignment='center',
-                transform=plt.gca().transAxes, fontsize=12)
-        plt.title(f'ROC Curves - {target_column} (No valid models)')
+                transform=ax.transAxes, fontsize=12)
+        ax.set_title(f'ROC Curves - {target_column} (No valid models)')
     
-    plt.savefig(os.path.join(save_path, f'roc_curves_{target_column}.png'), 
-                dpi=300, bbox_inches='tight')
-    plt.close()
-    plt.clf()
-    clear_gpu_memory()
+    PLOT_FIG.savefig(os.path.join(save_path, f'roc_curves_{target_column}.png'), 
+                     dpi=PLOT_DPI, bbox_inches='tight')
 
 def save_metrics_comparison(results_dict, target_column, save_path):
     """
@@ -455,39 +695,35 @@ def save_metrics_comparison(results_dict, target_column, save_path):
     metrics_to_plot = ['auc_roc', 'accuracy', 'precision', 'f1']
     
     for metric in metrics_to_plot:
-        plt.figure(figsize=(10, 6))
+        ax = reset_plot_axes((10, 6))
         
         try:
             df_pivot = df_metrics.pivot(index='model', columns='type', values=metric)
             if not df_pivot.empty:
-                df_pivot.plot(kind='bar')
-                plt.title(f'{metric.upper()} Comparison - {target_column}')
-                plt.ylabel(metric)
-                plt.xlabel('Model')
-                plt.xticks(rotation=45, ha='right')
-                plt.legend(title='Model Type')
-                plt.grid(True, alpha=0.3)
+                df_pivot.plot(kind='bar', ax=ax)
+                ax.set_title(f'{metric.upper()} Comparison - {target_column}')
+                ax.set_ylabel(metric)
+                ax.set_xlabel('Model')
+                plt.setp(ax.get_xticklabels(), rotation=45, ha='right')
+                ax.legend(title='Model Type')
+                ax.grid(True, alpha=0.3)
             else:
-                plt.text(0.5, 0.5, f'No valid data for {metric}', 
+                ax.text(0.5, 0.5, f'No valid data for {metric}', 
                         horizontalalignment='center', verticalalignment='center',
-                        transform=plt.gca().transAxes, fontsize=12)
-                plt.title(f'{metric.upper()} Comparison - {target_column} (No data)')
+                        transform=ax.transAxes, fontsize=12)
+                ax.set_title(f'{metric.upper()} Comparison - {target_column} (No data)')
         except Exception as e:
             print(f"Error plotting {metric} for {target_column}: {str(e)}")
-            plt.text(0.5, 0.5, f'Error plotting {metric}', 
+            ax.text(0.5, 0.5, f'Error plotting {metric}', 
                     horizontalalignment='center', verticalalignment='center',
-                    transform=plt.gca().transAxes, fontsize=12)
-            plt.title(f'{metric.upper()} Comparison - {target_column} (Error)')
+                    transform=ax.transAxes, fontsize=12)
+            ax.set_title(f'{metric.upper()} Comparison - {target_column} (Error)')
         
-        plt.tight_layout()
+        PLOT_FIG.tight_layout()
         
         # Save individual plot
-        plt.savefig(os.path.join(save_path, f'{metric}_{target_column}.png'), 
-                    dpi=300, bbox_inches='tight')
-        plt.close()
-        plt.clf()
-    
-    clear_gpu_memory()
+        PLOT_FIG.savefig(os.path.join(save_path, f'{metric}_{target_column}.png'), 
+                         dpi=PLOT_DPI, bbox_inches='tight')
     
     return df_metrics
 
@@ -503,9 +739,9 @@ def train_logistic_regression(X_train, y_train, X_val, y_val, target_column,
         
         if optimize:
             # Optimize hyperparameters
-            study = optuna.create_study(direction='maximize')
+            study = create_study('logistic_regression', target_column)
             study.optimize(lambda trial: safe_optimize_function(optimize_logistic_regression, trial, X_train, y_train, X_val, y_val), 
-                          n_trials=n_trials, n_jobs=-1)
+                          n_trials=n_trials, n_jobs=min(worker_threads or os.cpu_count() or 1, n_trials))
             
             # Train with best parameters
             best_params = study.best_params.copy()
@@ -514,12 +750,12 @@ def train_logistic_regression(X_train, y_train, X_val, y_val, target_column,
             else:
                 best_params['solver'] = 'lbfgs'
             best_params['max_iter'] = 300
-            best_params['n_jobs'] = -1
+            best_params['n_jobs'] = worker_threads or -1
             
             model = LogisticRegression(**best_params)
         else:
             # Use default parameters
-            model = LogisticRegression(max_iter=300, n_jobs=-1)
+            model = LogisticRegression(max_iter=300, n_jobs=worker_threads or -1)
         
         model.fit(X_train, y_train)
         
@@ -527,18 +763,17 @@ def train_logistic_regression(X_train, y_train, X_val, y_val, target_column,
         metrics, fpr, tpr, y_pred_proba = evaluate_model(model, X_val, y_val, 'Logistic Regression')
         
         # Save model
-        joblib.dump(model, os.path.join(model_save_path, 'logistic_regression_model.pkl'))
+        joblib.dump(model, os.path.join(model_save_path, 'logistic_regression_model.pkl'),
+                    compress=MODEL_COMPRESS, protocol=pickle.HIGHEST_PROTOCOL)
         
         print(f"Logistic Regression - AUC-ROC: {metrics['auc_roc']:.4f}")
         
-        clear_gpu_memory()
-        
-        return model, metrics
+        return model, metrics, fpr, tpr, y_pred_proba
         
     except Exception as e:
         print(f"Error training Logistic Regression for {target_column}: {str(e)}")
         traceback.print_exc()
-        return None, None
+        return None, None, None, None, None
 
 def train_xgboost(X_train, y_train, X_val, y_val, target_column, 
                   optimize=True, n_trials=50, save_path='./models'):
@@ -551,43 +786,46 @@ def train_xgboost(X_train, y_train, X_val, y_val, target_column,
         
         if optimize:
             # Optimize hyperparameters
-            study = optuna.create_study(direction='maximize')
-            study.optimize(lambda trial: safe_optimize_function(optimize_xgboost, trial, X_train, y_train, X_val, y_val), 
+            # Bin the data once; only the booster parameters change between trials
+            device_params = xgb_device_params(X_train)
+            dtrain = xgb.QuantileDMatrix(X_train, label=y_train, max_bin=256)
+            dval = xgb.QuantileDMatrix(X_val, label=y_val, ref=dtrain)
+            
+            study = create_study('xgboost', target_column)
+            study.optimize(lambda trial: safe_optimize_function(optimize_xgboost, trial, dtrain, dval, y_val, device_params), 
                           n_trials=n_trials)
+            del dtrain, dval
             
             # Train with best parameters
             best_params = study.best_params.copy()
             best_params.update({
-                'tree_method': 'gpu_hist' if torch.cuda.is_available() else 'hist',
-                'predictor': 'cpu_predictor',
-                'use_label_encoder': False,
                 'eval_metric': 'logloss',
                 'random_state': 42
             })
+            best_params.update(xgb_device_params(X_train))
             
             model = xgb.XGBClassifier(**best_params)
         else:
             # Use default parameters
-            model = xgb.XGBClassifier(use_label_encoder=False, eval_metric='logloss', random_state=42)
+            model = xgb.XGBClassifier(eval_metric='logloss', random_state=42, **n_jobs_param())
         
-        model.fit(X_train, y_train, eval_set=[(X_val, y_val)], verbose=False)
+        gpu_fit_with_retry(model.fit, X_train, y_train, eval_set=[(X_val, y_val)], verbose=False)
         
         # Evaluate
         metrics, fpr, tpr, y_pred_proba = evaluate_model(model, X_val, y_val, 'XGBoost')
         
         # Save model
-        joblib.dump(model, os.path.join(model_save_path, 'xgboost_model.pkl'))
+        joblib.dump(model, os.path.join(model_save_path, 'xgboost_model.pkl'),
+                    compress=MODEL_COMPRESS, protocol=pickle.HIGHEST_PROTOCOL)
         
         print(f"XGBoost - AUC-ROC: {metrics['auc_roc']:.4f}")
         
-        clear_gpu_memory()
-        
-        return model, metrics
+        return model, metrics, fpr, tpr, y_pred_proba
         
     except Exception as e:
         print(f"Error training XGBoost for {target_column}: {str(e)}")
         traceback.print_exc()
-        return None, None
+        return None, None, None, None, None
 
 def train_lightgbm(X_train, y_train, X_val, y_val, target_column, 
                    optimize=True, n_trials=50, save_path='./models'):
@@ -600,47 +838,46 @@ def train_lightgbm(X_train, y_train, X_val, y_val, target_column,
         
         if optimize:
             # Optimize hyperparameters
-            study = optuna.create_study(direction='maximize')
-            study.optimize(lambda trial: safe_optimize_function(optimize_lightgbm, trial, X_train, y_train, X_val, y_val), 
+            # Bin the data once; only the booster parameters change between trials
+            # (feature_pre_filter=False keeps it valid for any leaf-size setting)
+            device_params = lgb_device_params(X_train)
+            dataset_params = {'max_bin': 255, 'feature_pre_filter': False}
+            lgb_train = lgb.Dataset(X_train, label=y_train, params=dataset_params).construct()
+            lgb_val = lgb.Dataset(X_val, label=y_val, reference=lgb_train).construct()
+            
+            study = create_study('lightgbm', target_column)
+            study.optimize(lambda trial: safe_optimize_function(optimize_lightgbm, trial, lgb_train, lgb_val, X_val, y_val, device_params), 
                           n_trials=n_trials)
+            del lgb_train, lgb_val
             
             # Train with best parameters
             best_params = study.best_params.copy()
             best_params['random_state'] = 42
-            if torch.cuda.is_available():
-                best_params.update({
-                    'device': 'gpu',
-                    'gpu_use_dp': False,
-                })
+            best_params.update(device_params)
             
             model = lgb.LGBMClassifier(**best_params)
         else:
             # Use default parameters
-            model = lgb.LGBMClassifier(random_state=42)
+            model = lgb.LGBMClassifier(random_state=42, **n_jobs_param())
         
-        model.fit(X_train, y_train, eval_set=[(X_val, y_val)], 
-                  callbacks=[lgb.early_stopping(10), lgb.log_evaluation(0)])
-        
-        # Set to CPU for inference if it was using GPU
-        if 'device' in model.get_params() and model.get_params()['device'] == 'gpu':
-            model.set_params(device='cpu')
+        gpu_fit_with_retry(model.fit, X_train, y_train, eval_set=[(X_val, y_val)],
+                           callbacks=[lgb.early_stopping(10), lgb.log_evaluation(0)])
         
         # Evaluate
         metrics, fpr, tpr, y_pred_proba = evaluate_model(model, X_val, y_val, 'LightGBM')
         
         # Save model
-        joblib.dump(model, os.path.join(model_save_path, 'lightgbm_model.pkl'))
+        joblib.dump(model, os.path.join(model_save_path, 'lightgbm_model.pkl'),
+                    compress=MODEL_COMPRESS, protocol=pickle.HIGHEST_PROTOCOL)
         
         print(f"LightGBM - AUC-ROC: {metrics['auc_roc']:.4f}")
         
-        clear_gpu_memory()
-        
-        return model, metrics
+        return model, metrics, fpr, tpr, y_pred_proba
         
     except Exception as e:
         print(f"Error training LightGBM for {target_column}: {str(e)}")
         traceback.print_exc()
-        return None, None
+        return None, None, None, None, None
 
 def train_mlp(X_train, y_train, X_val, y_val, target_column, 
               optimize=True, n_trials=25, save_path='./models'):
@@ -656,9 +893,9 @@ def train_mlp(X_train, y_train, X_val, y_val, target_column,
         
         if optimize:
             # Optimize hyperparameters
-            study = optuna.create_study(direction='maximize')
+            study = create_study('mlp', target_column)
             study.optimize(lambda trial: safe_optimize_function(optimize_mlp, trial, X_train, y_train, X_val, y_val, input_dim), 
-                          n_trials=n_trials, n_jobs=-1)
+                          n_trials=n_trials, n_jobs=1)
             
             # Train with best parameters
             best_params = study.best_params
@@ -677,27 +914,33 @@ def train_mlp(X_train, y_train, X_val, y_val, target_column,
         # Ensure batch_size is not larger than dataset size
         batch_size = min(batch_size, len(X_train))
         
-        # Prepare data loaders
-        train_dataset = TensorDataset(torch.FloatTensor(X_train), torch.LongTensor(y_train))
-        val_dataset = TensorDataset(torch.FloatTensor(X_val), torch.LongTensor(y_val))
-        
-        # Set drop_last based on dataset size
-        drop_last = len(train_dataset) > batch_size
-        train_loader = DataLoader(train_dataset, batch_size=batch_size, shuffle=True, drop_last=drop_last)
-        val_loader = DataLoader(val_dataset, batch_size=batch_size, shuffle=False)
-        
         # Create and train model
         model = MLPClassifier(input_dim, hidden_dims, dropout_rate)
-        model, train_losses, val_losses = train_pytorch_model(model, train_loader, val_loader, 
-                                                              epochs=100, lr=lr, device=device)
-        model = model.to('cpu')
+        model, train_losses, val_losses = train_pytorch_model_with_retry(model, X_train, y_train, X_val, y_val,
+                                                                         batch_size=batch_size, epochs=100,
+                                                                         lr=lr, device=device, compile_model=True)
+        model = fuse_bn_linear(model)
         
-        # Evaluate
+        # Evaluate on the training device, then keep a host copy for saving
         metrics, fpr, tpr, y_pred_proba = evaluate_model(model, X_val, y_val, 'MLP', is_pytorch=True)
+        model = model.to('cpu')
+        
+        # An int8 dynamically quantized copy is faster for CPU inference; it
+        # is evaluated too and saved only if it scores as well, so the
+        # reported metrics are always those of the saved model
+        q_model = torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+        q_metrics, q_fpr, q_tpr, q_pred_proba = evaluate_model(q_model, X_val, y_val, 'MLP',
+                                                               is_pytorch=True, device='cpu')
+        quantized = q_metrics['auc_roc'] >= metrics['auc_roc'] - QUANTIZED_AUC_TOLERANCE
+        print(f"MLP int8 AUC-ROC: {q_metrics['auc_roc']:.4f} (float32: {metrics['auc_roc']:.4f}), "
+              f"saving the {'int8' if quantized else 'float32'} model")
+        if quantized:
+            model, metrics, fpr, tpr, y_pred_proba = q_model, q_metrics, q_fpr, q_tpr, q_pred_proba
         
-        # Save model
         torch.save({
             'model_state_dict': model.state_dict(),
+            'fused': True,
+            'quantized': quantized,
             'model_config': {
                 'input_dim': input_dim,
                 'hidden_dims': hidden_dims,
@@ -707,14 +950,12 @@ def train_mlp(X_train, y_train, X_val, y_val, target_column,
         
         print(f"MLP - AUC-ROC: {metrics['auc_roc']:.4f}")
         
-        clear_gpu_memory()
-        
-        return model, metrics
+        return model, metrics, fpr, tpr, y_pred_proba
         
     except Exception as e:
         print(f"Error training MLP for {target_column}: {str(e)}")
         traceback.print_exc()
-        return None, None
+        return None, None, None, None, None
 
 # Cell 7: Main Training Pipeline with Comprehensive Error Handling
 def train_all_models(X_train, y_train, X_val, y_val, target_column, n_trials=50):
@@ -734,17 +975,16 @@ def train_all_models(X_train, y_train, X_val, y_val, target_column, n_trials=50)
     print("\n1. Logistic Regression")
     try:
         # Default
-        lr_default = LogisticRegression(max_iter=300, n_jobs=-1)
+        lr_default = LogisticRegression(max_iter=300, n_jobs=worker_threads or -1)
         lr_default.fit(X_train, y_train)
         metrics, fpr, tpr, _ = evaluate_model(lr_default, X_val, y_val, 'Logistic Regression')
         results['default'].append({'model': 'Logistic Regression', 'metrics': metrics, 'fpr': fpr, 'tpr': tpr})
         print(f"Default AUC-ROC: {metrics['auc_roc']:.4f}")
         
         # Optimized
-        lr_optimized, metrics_opt = train_logistic_regression(X_train, y_train, X_val, y_val, 
-                                                             target_column, optimize=False, n_trials=n_trials)
+        lr_optimized, metrics, fpr, tpr, _ = train_logistic_regression(X_train, y_train, X_val, y_val, 
+                                                                       target_column, optimize=False, n_trials=n_trials)
         if lr_optimized is not None:
-            metrics, fpr, tpr, _ = evaluate_model(lr_optimized, X_val, y_val, 'Logistic Regression')
             results['optimized'].append({'model': 'Logistic Regression', 'metrics': metrics, 'fpr': fpr, 'tpr': tpr})
             trained_models['logistic_regression'] = lr_optimized
         else:
@@ -752,7 +992,6 @@ def train_all_models(X_train, y_train, X_val, y_val, target_column, n_trials=50)
         
         # Memory cleanup
         del lr_default
-        clear_gpu_memory()
         
     except Exception as e:
         print(f"Failed to train Logistic Regression: {str(e)}")
@@ -762,17 +1001,16 @@ def train_all_models(X_train, y_train, X_val, y_val, target_column, n_trials=50)
     print("\n2. XGBoost")
     try:
         # Default
-        xgb_default = xgb.XGBClassifier(use_label_encoder=False, eval_metric='logloss', random_state=42)
+        xgb_default = xgb.XGBClassifier(eval_metric='logloss', random_state=42, **n_jobs_param())
         xgb_default.fit(X_train, y_train)
         metrics, fpr, tpr, _ = evaluate_model(xgb_default, X_val, y_val, 'XGBoost')
         results['default'].append({'model': 'XGBoost', 'metrics': metrics, 'fpr': fpr, 'tpr': tpr})
         print(f"Default AUC-ROC: {metrics['auc_roc']:.4f}")
         
         # Optimized
-        xgb_optimized, metrics_opt = train_xgboost(X_train, y_train, X_val, y_val, 
-                                                  target_column, optimize=True, n_trials=n_trials)
+        xgb_optimized, metrics, fpr, tpr, _ = train_xgboost(X_train, y_train, X_val, y_val, 
+                                                            target_column, optimize=True, n_trials=n_trials)
         if xgb_optimized is not None:
-            metrics, fpr, tpr, _ = evaluate_model(xgb_optimized, X_val, y_val, 'XGBoost')
             results['optimized'].append({'model': 'XGBoost', 'metrics': metrics, 'fpr': fpr, 'tpr': tpr})
             trained_models['xgboost'] = xgb_optimized
         else:
@@ -780,7 +1018,6 @@ def train_all_models(X_train, y_train, X_val, y_val, target_column, n_trials=50)
         
         # Memory cleanup
         del xgb_default
-        clear_gpu_memory()
         
     except Exception as e:
         print(f"Failed to train XGBoost: {str(e)}")
@@ -790,17 +1027,16 @@ def train_all_models(X_train, y_train, X_val, y_val, target_column, n_trials=50)
     print("\n3. LightGBM")
     try:
         # Default
-        lgb_default = lgb.LGBMClassifier(random_state=42)
+        lgb_default = lgb.LGBMClassifier(random_state=42, **n_jobs_param())
         lgb_default.fit(X_train, y_train)
         metrics, fpr, tpr, _ = evaluate_model(lgb_default, X_val, y_val, 'LightGBM')
         results['default'].append({'model': 'LightGBM', 'metrics': metrics, 'fpr': fpr, 'tpr': tpr})
         print(f"Default AUC-ROC: {metrics['auc_roc']:.4f}")
         
         # Optimized
-        lgb_optimized, metrics_opt = train_lightgbm(X_train, y_train, X_val, y_val, 
-                                                   target_column, optimize=True, n_trials=n_trials)
+        lgb_optimized, metrics, fpr, tpr, _ = train_lightgbm(X_train, y_train, X_val, y_val, 
+                                                             target_column, optimize=True, n_trials=n_trials)
         if lgb_optimized is not None:
-            metrics, fpr, tpr, _ = evaluate_model(lgb_optimized, X_val, y_val, 'LightGBM')
             results['optimized'].append({'model': 'LightGBM', 'metrics': metrics, 'fpr': fpr, 'tpr': tpr})
             trained_models['lightgbm'] = lgb_optimized
         else:
@@ -808,7 +1044,6 @@ def train_all_models(X_train, y_train, X_val, y_val, target_column, n_trials=50)
         
         # Memory cleanup
         del lgb_default
-        clear_gpu_memory()
         
     except Exception as e:
         print(f"Failed to train LightGBM: {str(e)}")
@@ -823,30 +1058,23 @@ def train_all_models(X_train, y_train, X_val, y_val, target_column, n_trials=50)
         # Ensure batch size is appropriate for dataset size
         default_batch_size = min(64, len(X_train) // 2)
         
-        train_dataset = TensorDataset(torch.FloatTensor(X_train), torch.LongTensor(y_train))
-        val_dataset = TensorDataset(torch.FloatTensor(X_val), torch.LongTensor(y_val))
-        
-        # Set drop_last based on dataset size
-        drop_last = len(train_dataset) > default_batch_size
-        train_loader = DataLoader(train_dataset, batch_size=default_batch_size, shuffle=True, drop_last=drop_last)
-        val_loader = DataLoader(val_dataset, batch_size=default_batch_size, shuffle=False)
-        
         device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
         print(f"Training MLP on {device}")
         
         mlp_default = MLPClassifier(input_dim, hidden_dims=[128, 64])
-        mlp_default, _, _ = train_pytorch_model(mlp_default, train_loader, val_loader, device=device)
-        mlp_default = mlp_default.to('cpu')
+        mlp_default, _, _ = train_pytorch_model_with_retry(mlp_default, X_train, y_train, X_val, y_val,
+                                                           batch_size=default_batch_size, device=device,
+                                                           compile_model=True)
+        mlp_default = fuse_bn_linear(mlp_default)
         
         metrics, fpr, tpr, _ = evaluate_model(mlp_default, X_val, y_val, 'MLP', is_pytorch=True)
         results['default'].append({'model': 'MLP', 'metrics': metrics, 'fpr': fpr, 'tpr': tpr})
         print(f"Default AUC-ROC: {metrics['auc_roc']:.4f}")
         
         # Optimized
-        mlp_optimized, metrics_opt = train_mlp(X_train, y_train, X_val, y_val, 
-                                              target_column, optimize=True, n_trials=n_trials//2)
+        mlp_optimized, metrics, fpr, tpr, _ = train_mlp(X_train, y_train, X_val, y_val, 
+                                                        target_column, optimize=True, n_trials=n_trials//2)
         if mlp_optimized is not None:
-            metrics, fpr, tpr, _ = evaluate_model(mlp_optimized, X_val, y_val, 'MLP', is_pytorch=True)
             results['optimized'].append({'model': 'MLP', 'metrics': metrics, 'fpr': fpr, 'tpr': tpr})
             trained_models['mlp'] = mlp_optimized
         else:
@@ -854,7 +1082,6 @@ def train_all_models(X_train, y_train, X_val, y_val, target_column, n_trials=50)
         
         # Memory cleanup
         del mlp_default
-        clear_gpu_memory()
         
     except Exception as e:
         print(f"Failed to train MLP: {str(e)}")
@@ -867,6 +1094,15 @@ def train_all_models(X_train, y_train, X_val, y_val, target_column, n_trials=50)
     return results, trained_models
 
 # Cell 8: Model Saving and Loading Functions with Error Handling
+def thin_roc_curve(fpr, tpr, n_points=512):
+    """
+    Resample an ROC curve onto a fixed FPR grid for compact serialization
+    """
+    if len(fpr) <= n_points:
+        return np.asarray(fpr).tolist(), np.asarray(tpr).tolist()
+    grid = np.linspace(0.0, 1.0, n_points)
+    return grid.tolist(), np.interp(grid, fpr, tpr).tolist()
+
 def save_models_and_results(trained_models, scaler, feature_columns, 
                             target_column, results, base_path='./models'):
     """
@@ -878,26 +1114,29 @@ def save_models_and_results(trained_models, scaler, feature_columns,
         os.makedirs(target_path, exist_ok=True)
         
         # Save scaler
-        joblib.dump(scaler, os.path.join(target_path, 'scaler.pkl'))
+        joblib.dump(scaler, os.path.join(target_path, 'scaler.pkl'),
+                    compress=MODEL_COMPRESS, protocol=pickle.HIGHEST_PROTOCOL)
         
         # Save feature columns
         with open(os.path.join(target_path, 'feature_columns.json'), 'w') as f:
             json.dump(feature_columns, f)
         
-        # Save results
-        with open(os.path.join(target_path, 'training_results.json'), 'w') as f:
-            # Convert numpy arrays to lists for JSON serialization
-            results_json = {}
-            for key in results:
-                results_json[key] = []
-                for item in results[key]:
-                    item_copy = item.copy()
-                    if 'fpr' in item_copy and hasattr(item_copy['fpr'], 'tolist'):
-                        item_copy['fpr'] = item_copy['fpr'].tolist()
-                    if 'tpr' in item_copy and hasattr(item_copy['tpr'], 'tolist'):
-                        item_copy['tpr'] = item_copy['tpr'].tolist()
-                    results_json[key].append(item_copy)
-            json.dump(results_json, f)
+        # Save results, with ROC curves thinned to a fixed grid
+        results_json = {}
+        for key in results:
+            results_json[key] = []
+            for item in results[key]:
+                item_copy = item.copy()
+                if 'fpr' in item_copy and 'tpr' in item_copy:
+                    item_copy['fpr'], item_copy['tpr'] = thin_roc_curve(item_copy['fpr'], item_copy['tpr'])
+                results_json[key].append(item_copy)
+        results_file = os.path.join(target_path, 'training_results.json')
+        if orjson is not None:
+            with open(results_file, 'wb') as f:
+                f.write(orjson.dumps(results_json, option=orjson.OPT_SERIALIZE_NUMPY))
+        else:
+            with open(results_file, 'w') as f:
+                json.dump(results_json, f)
         
         print(f"\nModels and results saved to {target_path}")
         
@@ -940,6 +1179,10 @@ def load_model_for_inference(target_column, model_type='best', base_path='./mode
         if model_type == 'mlp':
             checkpoint = torch.load(os.path.join(target_path, f'{model_type}_model.pth'))
             model = MLPClassifier(**checkpoint['model_config'])
+            if checkpoint.get('fused', False):
+                model = fuse_bn_linear(model)
+            if checkpoint.get('quantized', False):
+                model = torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
             model.load_state_dict(checkpoint['model_state_dict'])
             model.eval()
         else:
@@ -983,8 +1226,7 @@ def predict_probabilities(csv_path, target_column, model_type='best', base_path=
         
         # Make predictions
         if selected_model == 'mlp':
-            with torch.no_grad():
-                probabilities = model(torch.FloatTensor(X_new_scaled)).squeeze(-1).numpy()
+            probabilities = predict_mlp_proba(model, X_new_scaled, device='cpu')
         else:
             probabilities = model.predict_proba(X_new_scaled)[:, 1]
         
@@ -1006,8 +1248,6 @@ def predict_probabilities(csv_path, target_column, model_type='best', base_path=
         print(f"Positive predictions: {(results_df['predicted_class'] == 1).sum()}")
         print(f"Negative predictions: {(results_df['predicted_class'] == 0).sum()}")
         
-        clear_gpu_memory()
-        
         return results_df
         
     except Exception as e:
@@ -1021,87 +1261,91 @@ print(f"GPU Available: {torch.cuda.is_available()}")
 if torch.cuda.is_available():
     print(f"GPU Device: {torch.cuda.get_device_name(0)}")
 
-# Process each target column
-all_results_file = 'all_results.pkl'
-if os.path.exists(all_results_file):
-    with open(all_results_file, 'rb') as f:
-        all_results = pickle.load(f)
+# Process each target column. Results live in a shelf keyed by target, so
+# each finished target writes only its own entry
+all_results_file = 'all_results'
+legacy_results_file = 'all_results.pkl'
+all_results_db = shelve.open(all_results_file, protocol=pickle.HIGHEST_PROTOCOL)
+if len(all_results_db) == 0 and os.path.exists(legacy_results_file):
+    with open(legacy_results_file, 'rb') as f:
+        all_results_db.update(pickle.load(f))
+    all_results_db.sync()
+all_results = {target: {key: value for key, value in entry.items() if key != 'trained_models'}
+               for target, entry in all_results_db.items()}
+if all_results:
     print("Loaded existing all_results.")
-else:
-    all_results = {}
 
-# Create summary for skipped columns
-skipped_columns = []
-failed_columns = []
+# The features are the same for every target, so extract them once and take
+# each target's observed rows from this matrix
+X_all, feature_columns = prepare_features(proteo_df)
 
-for target_column in target_columns:
-    
-    if os.path.exists(all_results_file):
-        with open(all_results_file, 'rb') as f:
-            all_results = pickle.load(f)
+def process_target(target_column):
+    """
+    Train, evaluate and save all models for one target column
     
+    Returns ``(target_column, status, payload)``: status 'ok' carries the
+    all_results entry, 'skipped' and 'failed' carry the summary record.
+    """
     print(f"\n{'='*60}")
     print(f"Processing target: {target_column}")
     print(f"{'='*60}")
     
     try:
-        # Drop NaN values for the target column
-        proteo_dm = proteo_df.dropna(subset=[target_column])
-        proteo = proteo_dm
+        # Keep the rows where the target column is observed. A nullable
+        # column comes back as float or object, so cast the labels to ints
+        y_all = proteo_df[target_column].to_numpy()
+        observed = ~pd.isna(y_all)
+        y = y_all[observed].astype(np.int64)
         
         # Check if we have enough samples
-        n_samples = len(proteo)
+        n_samples = len(y)
         if n_samples == 0:
             print(f"WARNING: No valid samples found for {target_column} (all values are NaN). Skipping this target.")
-            skipped_columns.append({
+            return target_column, 'skipped', {
                 'target': target_column,
                 'reason': 'No valid samples (all NaN)',
                 'n_samples': 0
-            })
-            continue
+            }
         
         # Check class distribution
-        unique_classes, class_counts = np.unique(proteo[target_column].values, return_counts=True)
+        unique_classes, class_counts = np.unique(y, return_counts=True)
         print(f"Total samples after dropping NaN: {n_samples}")
         print(f"Class distribution: {dict(zip(unique_classes, class_counts))}")
         
         # Check if we have both classes
         if len(unique_classes) < 2:
             print(f"WARNING: Only one class present for {target_column}. Need at least 2 classes for classification. Skipping this target.")
-            skipped_columns.append({
+            return target_column, 'skipped', {
                 'target': target_column,
                 'reason': f'Only one class present ({unique_classes[0]})',
                 'n_samples': n_samples,
                 'class_distribution': dict(zip(unique_classes, class_counts))
-            })
-            continue
+            }
         
         # Check minimum samples per class
         min_class_samples = min(class_counts)
         if min_class_samples < 2:
             print(f"WARNING: Insufficient samples in minority class for {target_column}. Skipping this target.")
-            skipped_columns.append({
+            return target_column, 'skipped', {
                 'target': target_column,
                 'reason': f'Insufficient samples in minority class (min={min_class_samples})',
                 'n_samples': n_samples,
                 'class_distribution': dict(zip(unique_classes, class_counts))
-            })
-            continue
+            }
         
         # Check if we have enough samples for train/test split
         min_samples_needed = 10
         if n_samples < min_samples_needed:
             print(f"WARNING: Insufficient total samples for {target_column} ({n_samples} < {min_samples_needed}). Skipping this target.")
-            skipped_columns.append({
+            return target_column, 'skipped', {
                 'target': target_column,
                 'reason': f'Insufficient total samples ({n_samples} < {min_samples_needed})',
                 'n_samples': n_samples,
                 'class_distribution': dict(zip(unique_classes, class_counts))
-            })
-            continue
+            }
         
         # Prepare data
-        X, y, feature_columns = prepare_data(proteo, target_column)
+        X = X_all[observed]
         
         # Split and scale data
         X_train, X_val, y_train, y_val, scaler = split_and_scale_data(X, y)
@@ -1131,36 +1375,78 @@ for target_column in target_columns:
             # Save models and results
             save_models_and_results(trained_models, scaler, feature_columns, target_column, results)
             
-            # Store results
-            all_results[target_column] = {
+            # The fitted estimators are already on disk under ./models/<target>,
+            # so all_results keeps only the metrics and ROC curves
+            return target_column, 'ok', {
                 'results': results,
-                'metrics_df': metrics_df,
-                'trained_models': trained_models
+                'metrics_df': metrics_df
             }
-            
-            with open(all_results_file, 'wb') as f:
-                pickle.dump(all_results, f)
-            print(f"Saved all_results for target '{target_column}' to '{all_results_file}'.")
         else:
             print(f"No valid models trained for {target_column}")
-            failed_columns.append({
+            return target_column, 'failed', {
                 'target': target_column,
                 'reason': 'No models successfully trained'
-            })
+            }
         
     except Exception as e:
         print(f"ERROR processing {target_column}: {str(e)}")
         traceback.print_exc()
-        failed_columns.append({
+        return target_column, 'failed', {
             'target': target_column,
             'reason': f'Error during processing: {str(e)}',
             'n_samples': n_samples if 'n_samples' in locals() else 'Unknown'
-        })
-        continue
+        }
+
+# Targets are independent, so on CPU-only hosts several train at once in
+# forked workers, which inherit proteo_df and X_all without copying. A forked
+# child cannot use CUDA once the parent has initialised it, so GPU runs stay
+# sequential.
+if torch.cuda.is_available():
+    n_target_workers = 1
+else:
+    n_target_workers = int(os.environ.get(
+        'TRAIN_TARGET_WORKERS', max(1, (os.cpu_count() or 1) // TARGET_WORKER_THREADS)))
+    n_target_workers = max(1, min(n_target_workers, len(target_columns)))
+
+# Create summary for skipped columns
+skipped_columns = []
+failed_columns = []
+
+if n_target_workers > 1:
+    # Split the CPUs between the workers, so their multi-threaded fits do not
+    # oversubscribe the machine
+    threads_per_worker = max(1, (os.cpu_count() or 1) // n_target_workers)
+    print(f"Training {n_target_workers} targets concurrently, "
+          f"{threads_per_worker} threads each")
+    target_executor = ProcessPoolExecutor(max_workers=n_target_workers,
+                                          mp_context=multiprocessing.get_context('fork'),
+                                          initializer=init_target_worker,
+                                          initargs=(threads_per_worker,))
+    outcomes = target_executor.map(process_target, target_columns)
+else:
+    target_executor = None
+    outcomes = map(process_target, target_columns)
+
+# Only this process writes all_results, as each target finishes
+for target_idx, (target_column, status, payload) in enumerate(outcomes, 1):
+    # Per-target arrays are freed by refcount when process_target returns;
+    # compacting the CUDA cache is only an occasional fallback for long runs
+    if target_idx % GPU_COMPACT_EVERY == 0:
+        clear_gpu_memory()
     
-    # Clear memory after each target column
-    clear_gpu_memory()
-    gc.collect()
+    if status == 'ok':
+        all_results[target_column] = payload
+        all_results_db[target_column] = payload
+        all_results_db.sync()
+        print(f"Saved all_results for target '{target_column}' to '{all_results_file}'.")
+    elif status == 'skipped':
+        skipped_columns.append(payload)
+    else:
+        failed_columns.append(payload)
+
+if target_executor is not None:
+    target_executor.shutdown()
+all_results_db.close()
 
 # Save summary of skipped columns
 if skipped_columns:
@@ -1188,49 +1474,49 @@ def create_model_summary_report(all_results, save_path='./results'):
     Create a comprehensive summary report for all models and targets with error handling
     """
     try:
-        summary_data = []
-        
+        metrics_frames = {}
         for target_column, target_results in all_results.items():
-            try:
-                if 'metrics_df' not in target_results or target_results['metrics_df'] is None:
-                    print(f"No metrics found for {target_column}, skipping...")
-                    continue
-                
-                metrics_df = target_results['metrics_df']
-                
-                if isinstance(metrics_df, pd.DataFrame) and not metrics_df.empty:
-                    # Filter out any rows with NaN AUC-ROC values
-                    valid_metrics = metrics_df.dropna(subset=['auc_roc'])
-                    
-                    if not valid_metrics.empty:
-                        # Get best model for this target
-                        best_model = valid_metrics.loc[valid_metrics['auc_roc'].idxmax()]
-                        
-                        # Calculate improvement if both default and optimized results exist
-                        optimized_results = valid_metrics[valid_metrics['type'] == 'optimized']
-                        default_results = valid_metrics[valid_metrics['type'] == 'default']
-                        
-                        improvement = 0.0
-                        if not optimized_results.empty and not default_results.empty:
-                            improvement = optimized_results['auc_roc'].max() - default_results['auc_roc'].max()
-                        
-                        summary_data.append({
-                            'target': target_column,
-                            'best_model': best_model['model'],
-                            'best_auc_roc': best_model['auc_roc'],
-                            'model_type': best_model['type'],
-                            'improvement': improvement,
-                            'n_models_trained': len(valid_metrics)
-                        })
-                    else:
-                        print(f"No valid metrics for {target_column}")
-                        
-            except Exception as e:
-                print(f"Error processing results for {target_column}: {str(e)}")
+            metrics_df = target_results.get('metrics_df')
+            if metrics_df is None:
+                print(f"No metrics found for {target_column}, skipping...")
                 continue
+            if isinstance(metrics_df, pd.DataFrame) and not metrics_df.empty:
+                metrics_frames[target_column] = metrics_df
+        
+        summary_df = pd.DataFrame()
+        if metrics_frames:
+            # One long table of every target's metrics; rows with NaN AUC-ROC are dropped
+            all_metrics = pd.concat([df.assign(target=target_column)
+                                     for target_column, df in metrics_frames.items()],
+                                    ignore_index=True)
+            valid_metrics = all_metrics.dropna(subset=['auc_roc'])
+            
+            valid_targets = set(valid_metrics['target'])
+            for target_column in metrics_frames:
+                if target_column not in valid_targets:
+                    print(f"No valid metrics for {target_column}")
+            
+            # Best model per target (first row with the highest AUC-ROC)
+            auc_by_target = valid_metrics.groupby('target', sort=False)['auc_roc']
+            best = valid_metrics.loc[auc_by_target.idxmax()]
+            
+            # Improvement of the best optimized over the best default model,
+            # zero unless a target has both
+            best_by_type = valid_metrics.pivot_table(index='target', columns='type',
+                                                     values='auc_roc', aggfunc='max')
+            best_by_type = best_by_type.reindex(columns=['default', 'optimized'])
+            improvement = (best_by_type['optimized'] - best_by_type['default']).fillna(0.0)
+            
+            summary_df = pd.DataFrame({
+                'target': best['target'].to_numpy(),
+                'best_model': best['model'].to_numpy(),
+                'best_auc_roc': best['auc_roc'].to_numpy(),
+                'model_type': best['type'].to_numpy(),
+                'improvement': improvement.reindex(best['target']).to_numpy(),
+                'n_models_trained': auc_by_target.size().reindex(best['target']).to_numpy()
+            })
         
-        if summary_data:
-            summary_df = pd.DataFrame(summary_data)
+        if not summary_df.empty:
             summary_df = summary_df.sort_values('best_auc_roc', ascending=False)
             summary_df.to_csv(os.path.join(save_path, 'model_summary_report.csv'), index=False)
             